@@ -7,6 +7,7 @@ from eventsourcing.persistence import (
     InfrastructureFactory,
     OperationalError,
     ProcessRecorder,
+    TrackingRecorder,
 )
 
 
@@ -27,5 +28,10 @@ class Factory(InfrastructureFactory):
     def application_recorder(self) -> ApplicationRecorder:
         raise NotImplementedError()
 
+    def tracking_recorder(
+        self, tracking_recorder_class: Any = None
+    ) -> TrackingRecorder:
+        raise NotImplementedError()
+
     def process_recorder(self) -> ProcessRecorder:
         raise NotImplementedError()
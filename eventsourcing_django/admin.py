@@ -1,8 +1,20 @@
 # -*- coding: utf-8 -*-
 from django.contrib import admin
 
-from .models import NotificationTrackingRecord, SnapshotRecord, StoredEventRecord
+from .models import (
+    NotificationTrackingRecord,
+    SnapshotRecord,
+    StoredEventRecord,
+    TrackingPositionRecord,
+    application_models,
+)
 
 admin.site.register(StoredEventRecord)
 admin.site.register(SnapshotRecord)
 admin.site.register(NotificationTrackingRecord)
+admin.site.register(TrackingPositionRecord)
+
+# Models created for applications with create_application_models().
+for model in application_models:
+    if not admin.site.is_registered(model):
+        admin.site.register(model)
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import lzma
+import zlib
+from typing import TYPE_CHECKING
+
+from eventsourcing.persistence import DataError
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+if TYPE_CHECKING:
+    from typing import Callable, Dict, Optional, Tuple, Union
+
+# Names of the codecs, which are recorded with each compressed state.
+CODEC_ZLIB = "zlib"
+CODEC_LZMA = "lzma"
+CODEC_ZSTD = "zstd"
+
+CODECS: Dict[str, Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]] = {
+    CODEC_ZLIB: (zlib.compress, zlib.decompress),
+    CODEC_LZMA: (lzma.compress, lzma.decompress),
+}
+if zstandard is not None:  # pragma: no cover
+    CODECS[CODEC_ZSTD] = (zstandard.compress, zstandard.decompress)
+
+
+def check_codec(codec: Optional[str]) -> None:
+    if codec is not None and codec not in CODECS:
+        raise ValueError(
+            f"Unknown or unavailable codec: {codec!r}. "
+            f"The available codecs are: {', '.join(CODECS)}."
+        )
+
+
+def encode_state(state: bytes, codec: Optional[str]) -> Tuple[bytes, Optional[str]]:
+    """Compresses the state with the codec, unless that doesn't make it smaller,
+    and returns the recorded state and the name of its codec (or None).
+    """
+    if codec is not None:
+        compressed = CODECS[codec][0](state)
+        if len(compressed) < len(state):
+            return compressed, codec
+    return state, None
+
+
+def decode_state(state: Union[bytes, memoryview], codec: Optional[str]) -> bytes:
+    """Decompresses the recorded state with the codec, if it has one."""
+    if isinstance(state, memoryview):
+        state = bytes(state)
+    if codec is None:
+        return state
+    try:
+        decompress = CODECS[codec][1]
+    except KeyError:
+        raise DataError(
+            f"Can't decompress state with unavailable codec: {codec!r}"
+        ) from None
+    return decompress(state)
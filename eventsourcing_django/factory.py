@@ -1,54 +1,171 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+from typing import Tuple, Type, TypeVar, cast
+
+from django.db import models
 from eventsourcing.persistence import (
     AggregateRecorder,
     ApplicationRecorder,
     InfrastructureFactory,
     ProcessRecorder,
-    TTrackingRecorder,
 )
-from eventsourcing.utils import Environment
+from eventsourcing.utils import Environment, resolve_topic, strtobool
 
-from eventsourcing_django.models import SnapshotRecord, StoredEventRecord
+from eventsourcing_django.models import (
+    SnapshotRecord,
+    StoredEventRecord,
+    TrackingPositionRecord,
+    create_application_models,
+)
 from eventsourcing_django.recorders import (
+    AsyncDjangoAggregateRecorder,
+    AsyncDjangoApplicationRecorder,
     DjangoAggregateRecorder,
     DjangoApplicationRecorder,
     DjangoProcessRecorder,
+    DjangoTrackingRecorder,
 )
 
+TDjangoTrackingRecorder = TypeVar(
+    "TDjangoTrackingRecorder", bound=DjangoTrackingRecorder
+)
 
-class Factory(InfrastructureFactory):
+
+class Factory(InfrastructureFactory[DjangoTrackingRecorder]):
     DJANGO_DB_ALIAS = "DJANGO_DB_ALIAS"
+    DJANGO_DB_READ_ALIAS = "DJANGO_DB_READ_ALIAS"
+    DJANGO_RAW_SELECT_EVENTS = "DJANGO_RAW_SELECT_EVENTS"
+    DJANGO_LOCK_MODE = "DJANGO_LOCK_MODE"
+    DJANGO_SINGLE_ROW_TRACKING = "DJANGO_SINGLE_ROW_TRACKING"
+    DJANGO_EVENT_CACHE_SIZE = "DJANGO_EVENT_CACHE_SIZE"
+    DJANGO_ASYNC_RECORDERS = "DJANGO_ASYNC_RECORDERS"
+    DJANGO_PREPARED_STATEMENTS = "DJANGO_PREPARED_STATEMENTS"
+    DJANGO_STATE_CODEC = "DJANGO_STATE_CODEC"
+    DJANGO_APPLICATION_TABLES = "DJANGO_APPLICATION_TABLES"
+    DJANGO_MAX_NOTIFICATION_ID_TTL = "DJANGO_MAX_NOTIFICATION_ID_TTL"
 
     def __init__(self, env: Environment):
         super().__init__(env)
         self.db_alias = self.env.get(self.DJANGO_DB_ALIAS) or None
+        self.db_read_alias = self.env.get(self.DJANGO_DB_READ_ALIAS) or None
+        self.raw_select_events = strtobool(
+            self.env.get(self.DJANGO_RAW_SELECT_EVENTS) or "no"
+        )
+        self.lock_mode = self.env.get(self.DJANGO_LOCK_MODE) or None
+        self.single_row_tracking = strtobool(
+            self.env.get(self.DJANGO_SINGLE_ROW_TRACKING) or "no"
+        )
+        self.event_cache_size = int(self.env.get(self.DJANGO_EVENT_CACHE_SIZE) or 0)
+        self.async_recorders = strtobool(
+            self.env.get(self.DJANGO_ASYNC_RECORDERS) or "no"
+        )
+        self.prepared_statements = strtobool(
+            self.env.get(self.DJANGO_PREPARED_STATEMENTS) or "no"
+        )
+        self.state_codec = self.env.get(self.DJANGO_STATE_CODEC) or None
+        self.application_tables_app_label = (
+            self.env.get(self.DJANGO_APPLICATION_TABLES) or None
+        )
+        self.max_notification_id_ttl = float(
+            self.env.get(self.DJANGO_MAX_NOTIFICATION_ID_TTL) or 0
+        )
+
+    def record_models(self) -> Tuple[Type[models.Model], Type[models.Model]]:
+        """
+        Returns the stored event model and the snapshot model of the application,
+        which are the models of the application's own tables when
+        DJANGO_APPLICATION_TABLES is set to the label of a Django app.
+        """
+        if self.application_tables_app_label:
+            return create_application_models(
+                self.application_tables_app_label, self.env.name
+            )
+        return StoredEventRecord, SnapshotRecord
 
     def aggregate_recorder(self, purpose: str = "events") -> AggregateRecorder:
+        stored_event_model, snapshot_record_model = self.record_models()
+        model: Type[models.Model]
+        snapshot_model: Type[models.Model] | None
         if purpose == "snapshots":
-            model = SnapshotRecord
+            model = snapshot_record_model
+            event_cache_size = 0
+            snapshot_model = None
+        else:
+            model = stored_event_model
+            event_cache_size = self.event_cache_size
+            snapshot_model = snapshot_record_model
+        recorder_class: type[DjangoAggregateRecorder]
+        if self.async_recorders:
+            recorder_class = AsyncDjangoAggregateRecorder
         else:
-            model = StoredEventRecord
-        return DjangoAggregateRecorder(
-            application_name=self.env.name, model=model, using=self.db_alias
+            recorder_class = DjangoAggregateRecorder
+        return recorder_class(
+            application_name=self.env.name,
+            model=model,
+            using=self.db_alias,
+            raw_select_events=self.raw_select_events,
+            event_cache_size=event_cache_size,
+            prepared_statements=self.prepared_statements,
+            snapshot_model=snapshot_model,
+            codec=self.state_codec,
+            read_using=self.db_read_alias,
         )
 
     def application_recorder(self) -> ApplicationRecorder:
-        return DjangoApplicationRecorder(
+        stored_event_model, snapshot_model = self.record_models()
+        recorder_class: type[DjangoApplicationRecorder]
+        if self.async_recorders:
+            recorder_class = AsyncDjangoApplicationRecorder
+        else:
+            recorder_class = DjangoApplicationRecorder
+        return recorder_class(
             application_name=self.env.name,
-            model=StoredEventRecord,
+            model=stored_event_model,
             using=self.db_alias,
+            raw_select_events=self.raw_select_events,
+            lock_mode=self.lock_mode,
+            event_cache_size=self.event_cache_size,
+            prepared_statements=self.prepared_statements,
+            snapshot_model=snapshot_model,
+            codec=self.state_codec,
+            read_using=self.db_read_alias,
+            max_notification_id_ttl=self.max_notification_id_ttl,
         )
 
     def process_recorder(self) -> ProcessRecorder:
+        stored_event_model, snapshot_model = self.record_models()
         return DjangoProcessRecorder(
             application_name=self.env.name,
-            model=StoredEventRecord,
+            model=stored_event_model,
             using=self.db_alias,
+            raw_select_events=self.raw_select_events,
+            lock_mode=self.lock_mode,
+            event_cache_size=self.event_cache_size,
+            prepared_statements=self.prepared_statements,
+            snapshot_model=snapshot_model,
+            codec=self.state_codec,
+            read_using=self.db_read_alias,
+            max_notification_id_ttl=self.max_notification_id_ttl,
+            single_row_tracking=self.single_row_tracking,
         )
 
     def tracking_recorder(
-        self, tracking_recorder_class: type[TTrackingRecorder] | None = None
-    ) -> TTrackingRecorder:
-        raise NotImplementedError
+        self, tracking_recorder_class: type[TDjangoTrackingRecorder] | None = None
+    ) -> TDjangoTrackingRecorder:
+        if tracking_recorder_class is None:
+            tracking_recorder_topic = self.env.get(self.TRACKING_RECORDER_TOPIC)
+            if tracking_recorder_topic:
+                tracking_recorder_class = resolve_topic(tracking_recorder_topic)
+            else:
+                tracking_recorder_class = cast(
+                    "type[TDjangoTrackingRecorder]", DjangoTrackingRecorder
+                )
+        assert tracking_recorder_class is not None
+        assert issubclass(tracking_recorder_class, DjangoTrackingRecorder)
+        return tracking_recorder_class(
+            application_name=self.env.name,
+            model=TrackingPositionRecord,
+            using=self.db_alias,
+            prepared_statements=self.prepared_statements,
+        )
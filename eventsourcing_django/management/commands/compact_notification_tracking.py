@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import argparse
+from typing import Any
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Max
+from eventsourcing.persistence import IntegrityError, Tracking
+
+from eventsourcing_django.models import (
+    NotificationTrackingRecord,
+    TrackingPositionRecord,
+)
+from eventsourcing_django.recorders import DjangoTrackingRecorder
+
+
+class Command(BaseCommand):
+    """The notification tracking compaction command."""
+
+    help = (
+        "Delete all but the latest notification tracking record of each follower for"
+        " each of its leaders."
+    )
+
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "args",
+            metavar="follower",
+            nargs="*",
+            help="The followers to compact. Defaults to compact all followers.",
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="The database to compact. Defaults to the 'default' database.",
+        )
+        parser.add_argument(
+            "--to-positions",
+            action="store_true",
+            default=False,
+            help=(
+                "Record the latest positions in the tracking positions table, and"
+                " delete all the notification tracking records. Only use this after"
+                " switching the followers to single-row tracking."
+            ),
+        )
+
+    def handle(self, *followers: str, **options: Any) -> None:
+        alias = options["database"]
+        to_positions = options["to_positions"]
+        is_printing = options["verbosity"] > 0
+
+        q = NotificationTrackingRecord.objects.using(alias)
+        if followers:
+            q = q.filter(application_name__in=followers)
+        latest_positions = (
+            q.values("application_name", "upstream_application_name")
+            .annotate(notification_id=Max("notification_id"))
+            .order_by("application_name", "upstream_application_name")
+        )
+
+        for position in latest_positions:
+            application_name = position["application_name"]
+            upstream_application_name = position["upstream_application_name"]
+            notification_id = position["notification_id"]
+            records = NotificationTrackingRecord.objects.using(alias).filter(
+                application_name=application_name,
+                upstream_application_name=upstream_application_name,
+            )
+            with transaction.atomic(using=alias):
+                if to_positions:
+                    recorder = DjangoTrackingRecorder(
+                        application_name=application_name,
+                        model=TrackingPositionRecord,
+                        using=alias,
+                    )
+                    try:
+                        recorder.insert_tracking(
+                            Tracking(upstream_application_name, notification_id)
+                        )
+                    except IntegrityError:
+                        # The follower has already moved past this position.
+                        pass
+                else:
+                    records = records.filter(notification_id__lt=notification_id)
+                deleted_count, _ = records.delete()
+
+            if is_printing:
+                self.stdout.write(
+                    f"{self.style.MIGRATE_LABEL(application_name)} following "
+                    f"{self.style.MIGRATE_LABEL(upstream_application_name)}: deleted "
+                    f"{deleted_count} record{'' if deleted_count == 1 else 's'}, "
+                    f"latest position is {notification_id}"
+                )
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import argparse
+from typing import Any
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from eventsourcing_django.models import StoredEventRecord
+from eventsourcing_django.partitioning import (
+    create_partition,
+    move_to_partition,
+    partition_name,
+    partition_table,
+    table_exists,
+)
+
+
+class Command(BaseCommand):
+    """The stored events partitioning command."""
+
+    help = (
+        "Convert the stored events table into a table that is partitioned by"
+        " application name (PostgreSQL only), and create partitions for the given"
+        " applications, moving their stored events into the new partitions."
+    )
+
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "args",
+            metavar="application",
+            nargs="*",
+            help=(
+                "The applications to create partitions for. Their stored events are"
+                " moved from the default partition into the new partitions."
+            ),
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="The database to partition. Defaults to the 'default' database.",
+        )
+        parser.add_argument(
+            "--table",
+            default=StoredEventRecord._meta.db_table,
+            help="The table to partition. Defaults to the 'stored_events' table.",
+        )
+
+    def handle(self, *applications: str, **options: Any) -> None:
+        alias = options["database"]
+        table = options["table"]
+        is_printing = options["verbosity"] > 0
+        connection = connections[alias]
+        if connection.vendor != "postgresql":
+            raise CommandError("Only PostgreSQL tables can be partitioned.")
+
+        with transaction.atomic(using=alias):
+            is_converted = partition_table(connection, table)
+        if is_printing:
+            if is_converted:
+                self.stdout.write(f"Partitioned {self.style.MIGRATE_LABEL(table)}")
+            else:
+                self.stdout.write(
+                    f"{self.style.MIGRATE_LABEL(table)} is already partitioned"
+                )
+
+        for application_name in applications:
+            partition = partition_name(table, application_name)
+            label = self.style.MIGRATE_LABEL(application_name)
+            if table_exists(connection, partition):
+                if is_printing:
+                    self.stdout.write(f"{label} already has partition {partition}")
+            elif create_partition(connection, table, application_name):
+                if is_printing:
+                    self.stdout.write(f"Created partition {partition} for {label}")
+            else:
+                # Each application is moved in its own transaction.
+                with transaction.atomic(using=alias):
+                    moved_count = move_to_partition(connection, table, application_name)
+                if is_printing:
+                    self.stdout.write(
+                        f"Moved {moved_count} row{'' if moved_count == 1 else 's'} "
+                        f"of {label} to {partition}"
+                    )
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import argparse
+from typing import Any, Dict, Optional, Type
+
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+
+from eventsourcing_django.compression import CODECS, decode_state, encode_state
+from eventsourcing_django.models import (
+    AbstractSnapshotRecord,
+    AbstractStoredEventRecord,
+    SnapshotRecord,
+    StoredEventRecord,
+)
+
+TABLES: Dict[str, Type[models.Model]] = {
+    "events": StoredEventRecord,
+    "snapshots": SnapshotRecord,
+}
+
+
+class Command(BaseCommand):
+    """The state recompression command."""
+
+    help = (
+        "Compress the recorded states of stored events and snapshots with a codec"
+        " (or decompress them), in batches of rows, each in its own transaction."
+    )
+
+    def add_arguments(self, parser: argparse.ArgumentParser) -> None:
+        parser.add_argument(
+            "args",
+            metavar="application",
+            nargs="*",
+            help="The applications to recompress. Defaults to all applications.",
+        )
+        parser.add_argument(
+            "--codec",
+            required=True,
+            choices=[*CODECS, "none"],
+            help="The codec to compress with, or 'none' to decompress.",
+        )
+        parser.add_argument(
+            "--table",
+            choices=[*TABLES, "all"],
+            default="all",
+            help="The table to recompress. Defaults to both tables.",
+        )
+        parser.add_argument(
+            "--model",
+            dest="models",
+            action="append",
+            metavar="APP_LABEL.MODEL_NAME",
+            default=[],
+            help=(
+                "A stored event or snapshot model whose table is recompressed instead"
+                " of the tables given by --table, e.g. a model created by"
+                " create_application_models(). Can be given more than once."
+            ),
+        )
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="The database to recompress. Defaults to the 'default' database.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="The number of rows to select and update in each transaction.",
+        )
+        parser.add_argument(
+            "--max-rows",
+            type=int,
+            default=None,
+            help=(
+                "The maximum number of rows to update in each table, so that a"
+                " large table can be recompressed gradually, over many runs."
+            ),
+        )
+
+    def handle(self, *applications: str, **options: Any) -> None:
+        codec = None if options["codec"] == "none" else options["codec"]
+        if options["batch_size"] < 1:
+            raise CommandError("The batch size must be a positive number.")
+        if options["models"]:
+            record_models = [self._get_model(label) for label in options["models"]]
+        elif options["table"] == "all":
+            record_models = list(TABLES.values())
+        else:
+            record_models = [TABLES[options["table"]]]
+        for model in record_models:
+            updated_count = self._recompress(
+                model,
+                applications,
+                codec,
+                options["database"],
+                options["batch_size"],
+                options["max_rows"],
+            )
+            if options["verbosity"] > 0:
+                self.stdout.write(
+                    f"{self.style.MIGRATE_LABEL(model._meta.db_table)}: recompressed "
+                    f"{updated_count} row{'' if updated_count == 1 else 's'}"
+                )
+
+    def _get_model(self, label: str) -> Type[models.Model]:
+        try:
+            model = apps.get_model(label)
+        except (LookupError, ValueError) as e:
+            raise CommandError(f"Invalid model {label!r}: {e}") from e
+        if not issubclass(model, (AbstractStoredEventRecord, AbstractSnapshotRecord)):
+            raise CommandError(
+                f"Model {label!r} is not a stored event or snapshot model."
+            )
+        return model
+
+    def _recompress(
+        self,
+        model: Type[models.Model],
+        applications: tuple[str, ...],
+        codec: Optional[str],
+        alias: str,
+        batch_size: int,
+        max_rows: Optional[int],
+    ) -> int:
+        q = model.objects.using(alias).order_by("pk")
+        if applications:
+            q = q.filter(application_name__in=applications)
+        # Rows that can't be made smaller are selected again by later runs.
+        if codec is None:
+            q = q.filter(codec__isnull=False)
+        else:
+            q = q.exclude(codec=codec)
+        q = q.only("pk", "state", "codec")
+
+        updated_count = 0
+        last_pk = None
+        while max_rows is None or updated_count < max_rows:
+            batch_q = q if last_pk is None else q.filter(pk__gt=last_pk)
+            records = list(batch_q[:batch_size])
+            if not records:
+                break
+            last_pk = records[-1].pk
+            updated = []
+            for record in records:
+                state, record_codec = encode_state(
+                    decode_state(record.state, record.codec), codec
+                )
+                if record_codec != record.codec:
+                    record.state, record.codec = state, record_codec
+                    updated.append(record)
+            if max_rows is not None:
+                updated = updated[: max_rows - updated_count]
+            with transaction.atomic(using=alias):
+                model.objects.using(alias).bulk_update(updated, ["state", "codec"])
+            updated_count += len(updated)
+        return updated_count
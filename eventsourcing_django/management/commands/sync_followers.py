@@ -2,15 +2,23 @@
 from __future__ import annotations
 
 import argparse
+import signal
+import threading
 from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack, nullcontext
+from graphlib import CycleError, TopologicalSorter
+from time import monotonic
 from typing import (
     Any,
     Callable,
+    ContextManager,
     Dict,
     Iterable,
     List,
     Mapping,
     Optional,
+    Set,
     Tuple,
     TypeVar,
     cast,
@@ -29,37 +37,166 @@ from django.core.exceptions import (
     ObjectDoesNotExist,
 )
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
-from eventsourcing.application import Application
+from django.db import (
+    DEFAULT_DB_ALIAS,
+    close_old_connections,
+    connections,
+    transaction,
+)
+from eventsourcing.application import Application, Cache, LRUCache
 from eventsourcing.domain import EventSourcingError
 from eventsourcing.system import Follower, Runner, System
 
-from eventsourcing_django.recorders import DjangoAggregateRecorder
+from eventsourcing_django.recorders import (
+    DjangoAggregateRecorder,
+    DjangoApplicationRecorder,
+    DjangoProcessRecorder,
+)
 
 TApplication = TypeVar("TApplication", bound=Application[Any])
 
+# Errors that fail the synchronization of one follower, without stopping the command.
+SYNC_ERRORS = (
+    EmptyResultSet,
+    EventSourcingError,
+    FieldDoesNotExist,
+    FieldError,
+    MultipleObjectsReturned,
+    ObjectDoesNotExist,
+)
+
 
 def sync_follower_with_leaders(
-    follower: Follower[UUID | str], leader_names: Iterable[str]
+    follower: Follower[UUID | str],
+    leader_names: Iterable[str],
+    *,
+    max_events: Optional[int] = None,
+    deadline: Optional[float] = None,
+    commit_every: Optional[int] = None,
+    using: Optional[str] = None,
+    stopping: Optional[threading.Event] = None,
+    batch: bool = False,
 ) -> Dict[str, int]:
-    """Synchronize a follower with its leader apps."""
-    events_counter = {}
+    """Synchronize a follower with its leader apps.
 
-    for leader_name in leader_names:
-        # The library isn't telling us how many events it actually processed,
-        # so we first do a dry-run selection of all new notifications.
-        events_counter[leader_name] = 0
-        start = follower.recorder.max_tracking_id(leader_name)
-        for batch in follower.pull_notifications(
-            leader_name, start, inclusive_of_start=False
-        ):
-            events_counter[leader_name] += len(batch)
+    Stops after processing `max_events` events, when the `time.monotonic()`
+    clock passes the `deadline`, or when the `stopping` event is set. If
+    `commit_every` is given, the events are processed in transactions of (at
+    most) that many events on the `using` database, otherwise in the caller's
+    transaction. If `batch` is true, the new events and tracking records of
+    each transaction (or else each batch of pulled notifications) are inserted
+    together (see :func:`batch_inserts`).
+
+    If processing the events fails, the follower's aggregate cache is cleared,
+    since it may hold aggregates whose new events have not been recorded.
 
-        follower.pull_and_process(leader_name, start)
+    Returns the number of events processed from each leader app.
+    """
+    events_counter = {}
+    total_count = 0
+    uncommitted_count = 0
+
+    try:
+        with ExitStack() as transactions:
+            for leader_name in leader_names:
+                # Like Follower.pull_and_process(), but counting the processed
+                # events as they go, so that the new notifications are only
+                # selected once.
+                events_counter[leader_name] = 0
+                start = follower.recorder.max_tracking_id(leader_name)
+                for notifications in follower.pull_notifications(
+                    leader_name, start, inclusive_of_start=False
+                ):
+                    notifications = follower.filter_received_notifications(
+                        notifications
+                    )
+                    for domain_event, tracking in follower.convert_notifications(
+                        leader_name, notifications
+                    ):
+                        if (
+                            (max_events is not None and total_count >= max_events)
+                            or (deadline is not None and monotonic() >= deadline)
+                            or (stopping is not None and stopping.is_set())
+                        ):
+                            return events_counter
+                        if uncommitted_count == 0:
+                            if commit_every is not None:
+                                transactions.enter_context(
+                                    transaction.atomic(using=using)
+                                )
+                            if batch:
+                                transactions.enter_context(batch_inserts(follower))
+                        follower.process_event(domain_event, tracking)
+                        events_counter[leader_name] += 1
+                        total_count += 1
+                        uncommitted_count += 1
+                        if (
+                            commit_every is not None
+                            and uncommitted_count >= commit_every
+                        ):
+                            transactions.close()
+                            uncommitted_count = 0
+                    if commit_every is None and uncommitted_count:
+                        # Insert the events and tracking records of each pulled
+                        # batch.
+                        transactions.close()
+                        uncommitted_count = 0
+    except BaseException:
+        clear_aggregate_cache(follower)
+        raise
 
     return events_counter
 
 
+def batch_inserts(follower: Follower[UUID | str]) -> ContextManager[Any]:
+    """Buffers the events and tracking records of the follower, if possible,
+    so that they are inserted with one statement for each table.
+
+    The events aren't buffered if the follower has an aggregate cache, since
+    aggregates are put in the cache before the buffered events are inserted.
+    """
+    if (
+        isinstance(follower.recorder, DjangoProcessRecorder)
+        and follower.repository.cache is None
+    ):
+        return follower.recorder.batch()
+    return nullcontext()
+
+
+def clear_aggregate_cache(follower: Follower[UUID | str]) -> None:
+    """Empties the follower's aggregate cache, if it has one."""
+    cache = follower.repository.cache
+    if isinstance(cache, LRUCache):
+        follower.repository.cache = LRUCache(maxsize=cache.maxsize)
+    elif cache is not None:
+        follower.repository.cache = Cache()
+
+
+def topological_order(system: System) -> List[str]:
+    """Returns the names of the apps of a system, each leader before its followers,
+    or in the order of the system's nodes if the pipes make a cycle.
+    """
+    sorter = TopologicalSorter(
+        {name: system.follows.get(name, []) for name in system.nodes}
+    )
+    try:
+        return list(sorter.static_order())
+    except CycleError:
+        return list(system.nodes)
+
+
+def upstream_apps(system: System, name: str) -> Set[str]:
+    """Returns the names of the apps that an app follows, directly or not."""
+    upstream: Set[str] = set()
+    leader_names = list(system.follows.get(name, []))
+    while leader_names:
+        leader_name = leader_names.pop()
+        if leader_name not in upstream:
+            upstream.add(leader_name)
+            leader_names.extend(system.follows.get(leader_name, []))
+    return upstream
+
+
 def get_eventsourcing_runner() -> Runner[UUID | str]:
     """Get the instance of a :class:`~eventsourcing.system.Runner` to run against.
 
@@ -155,7 +292,13 @@ class Command(BaseCommand):
     is_printing: bool
     is_verbose: bool
     is_dry_run: bool
-    has_failures: bool
+    failed_followers: Set[str]
+    commit_every: Optional[int]
+    batch_inserts: bool
+    max_events: Optional[int]
+    deadline: Optional[float]
+    stopping: threading.Event
+    round_events_count: int
 
     help = "Synchronize follower apps with unseen events from their leader apps."
 
@@ -176,12 +319,120 @@ class Command(BaseCommand):
                 " roll back all changes at the end."
             ),
         )
+        parser.add_argument(
+            "-j",
+            "--jobs",
+            type=int,
+            default=1,
+            help=(
+                "The number of followers to synchronize concurrently, each in its own"
+                " thread and database transaction. Defaults to 1, which synchronizes"
+                " the followers one after another, in one transaction per database."
+            ),
+        )
+        parser.add_argument(
+            "--commit-every",
+            type=int,
+            default=None,
+            metavar="N",
+            help=(
+                "Commit the changes of each follower after every N processed events,"
+                " rather than in one transaction at the end."
+            ),
+        )
+        parser.add_argument(
+            "--batch-inserts",
+            action="store_true",
+            default=False,
+            help=(
+                "Insert the new events and tracking records of each transaction of"
+                " each follower together, with one statement for each table."
+                " Followers with an aggregate cache insert them one by one."
+            ),
+        )
+        parser.add_argument(
+            "--max-events",
+            type=int,
+            default=None,
+            metavar="N",
+            help="Stop synchronizing each follower after it has processed N events.",
+        )
+        parser.add_argument(
+            "--time-budget",
+            type=float,
+            default=None,
+            metavar="SECONDS",
+            help=(
+                "Stop synchronizing followers once the command has been running for"
+                " this many seconds. Events that have been processed are kept."
+            ),
+        )
+        parser.add_argument(
+            "--follow",
+            action="store_true",
+            default=False,
+            help=(
+                "Keep running, and synchronize the followers whenever their leaders"
+                " have new events, until the command is stopped with SIGTERM or SIGINT."
+            ),
+        )
+        parser.add_argument(
+            "--poll-interval",
+            type=float,
+            default=0.5,
+            metavar="SECONDS",
+            help=(
+                "In follow mode, the shortest time to wait before checking the leaders"
+                " for new events, when the followers are idle. Defaults to 0.5."
+            ),
+        )
+        parser.add_argument(
+            "--max-poll-interval",
+            type=float,
+            default=30.0,
+            metavar="SECONDS",
+            help=(
+                "In follow mode, the longest time to wait before checking the leaders"
+                " for new events. The time waited doubles each time the followers are"
+                " found to be idle, up to this limit. Defaults to 30."
+            ),
+        )
 
     def handle(self, *followers: str, **options: Any) -> None:
         self.is_printing = options["verbosity"] > 0
         self.is_verbose = options["verbosity"] > 1
         self.is_dry_run = options["dry_run"]
-        self.has_failures = False
+        self.failed_followers = set()
+        self.commit_every = options["commit_every"]
+        self.batch_inserts = options["batch_inserts"]
+        self.max_events = options["max_events"]
+        self.stopping = threading.Event()
+        self.round_events_count = 0
+        time_budget = options["time_budget"]
+        is_following = options["follow"]
+        poll_interval = options["poll_interval"]
+        max_poll_interval = options["max_poll_interval"]
+        jobs = options["jobs"]
+        if jobs < 1:
+            raise CommandError("The number of jobs must be at least 1.")
+        if self.commit_every is not None and self.commit_every < 1:
+            raise CommandError("The number of events per commit must be at least 1.")
+        if self.commit_every is not None and self.is_dry_run:
+            raise CommandError(
+                "The --commit-every option can't be used in dry-run mode."
+            )
+        if self.max_events is not None and self.max_events < 1:
+            raise CommandError("The maximum number of events must be at least 1.")
+        if time_budget is not None and time_budget <= 0:
+            raise CommandError("The time budget must be positive.")
+        if is_following and self.is_dry_run:
+            raise CommandError("The --follow option can't be used in dry-run mode.")
+        if not 0 < poll_interval <= max_poll_interval:
+            raise CommandError(
+                "The poll interval must be positive, and not more than the maximum"
+                " poll interval."
+            )
+        self.deadline = monotonic() + time_budget if time_budget is not None else None
 
         runner: Runner[UUID | str] = get_eventsourcing_runner()
         system: System = runner.system
@@ -201,24 +452,204 @@ class Command(BaseCommand):
             alias = recorder.using
             follower_apps_by_alias[alias].append((position, follower_app))
 
+        if is_following:
+            self._follow(
+                runner,
+                jobs,
+                system,
+                follower_apps_by_alias,
+                _print_app_label,
+                poll_interval,
+                max_poll_interval,
+            )
+        else:
+            self._sync(jobs, system, follower_apps_by_alias, _print_app_label)
+
+        if (
+            self.is_printing
+            and self.deadline is not None
+            and monotonic() >= self.deadline
+        ):
+            self.stdout.write(
+                self.style.WARNING(
+                    "The time budget has been used up. Re-run the command to"
+                    " process the remaining events."
+                )
+            )
+        if self.is_printing and self.failed_followers and not self.is_verbose:
+            self.stderr.write(
+                "There were errors during synchronisation, please re-run with a higher"
+                " verbosity level (try: `--verbosity 2`)."
+            )
+        if self.failed_followers:
+            failures_count = len(self.failed_followers)
+            raise CommandError(
+                f"Failed to synchronize {failures_count} "
+                f"follower{'' if failures_count == 1 else 's'}."
+            )
+
+    def _sync(
+        self,
+        jobs: int,
+        system: System,
+        follower_apps_by_alias: Mapping[
+            Optional[str], List[Tuple[int, Follower[UUID | str]]]
+        ],
+        print_app_label: Callable[[int, str], None],
+    ) -> None:
+        if jobs > 1:
+            self._sync_concurrently(
+                jobs, system, follower_apps_by_alias, print_app_label
+            )
+        else:
+            self._sync_sequentially(system, follower_apps_by_alias, print_app_label)
+
+    def _follow(
+        self,
+        runner: Runner[UUID | str],
+        jobs: int,
+        system: System,
+        follower_apps_by_alias: Mapping[
+            Optional[str], List[Tuple[int, Follower[UUID | str]]]
+        ],
+        print_app_label: Callable[[int, str], None],
+        poll_interval: float,
+        max_poll_interval: float,
+    ) -> None:
+        follower_apps = [
+            follower_app
+            for follower_apps in follower_apps_by_alias.values()
+            for _, follower_app in follower_apps
+        ]
+        leader_apps = {
+            leader_name: runner.get(system.get_app_cls(leader_name))
+            for follower_app in follower_apps
+            for leader_name in system.follows[follower_app.name]
+        }
+
+        # Wake up as soon as leaders in this process record new events, or
+        # when the command is asked to stop.
+        wake_up = threading.Event()
+        leader_recorders = [
+            leader_app.recorder
+            for leader_app in leader_apps.values()
+            if isinstance(leader_app.recorder, DjangoApplicationRecorder)
+        ]
+        for leader_recorder in leader_recorders:
+            leader_recorder.listen(wake_up)
+
+        def stop(signum: int, frame: Any) -> None:
+            self.stopping.set()
+            wake_up.set()
+
+        previous_handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGTERM, signal.SIGINT):
+                previous_handlers[signum] = signal.signal(signum, stop)
+
+        interval = poll_interval
+        try:
+            while not self.stopping.is_set() and not (
+                self.deadline is not None and monotonic() >= self.deadline
+            ):
+                wake_up.clear()
+                # Like Django's request cycle, replace connections that are
+                # unusable, or that have been open longer than CONN_MAX_AGE.
+                close_old_connections()
+                lags = self._get_lags(follower_apps, leader_apps, system)
+                self._print_lags(lags)
+                if any(lags.values()):
+                    self.round_events_count = 0
+                    self._sync(jobs, system, follower_apps_by_alias, print_app_label)
+                    if self.round_events_count:
+                        interval = poll_interval
+                        continue
+                # The followers are idle, or can't make progress.
+                timeout = interval
+                if self.deadline is not None:
+                    timeout = max(0.0, min(timeout, self.deadline - monotonic()))
+                if not wake_up.wait(timeout):
+                    interval = min(interval * 2, max_poll_interval)
+                else:
+                    interval = poll_interval
+        finally:
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+            for leader_recorder in leader_recorders:
+                leader_recorder.unlisten(wake_up)
+
+        if self.is_printing and self.stopping.is_set():
+            self.stdout.write("Stopped following.")
+
+    @staticmethod
+    def _get_lags(
+        follower_apps: List[Follower[UUID | str]],
+        leader_apps: Mapping[str, Application[Any]],
+        system: System,
+    ) -> Dict[str, int]:
+        """Returns the number of notifications each follower is behind its leaders.
+
+        Followers that filter notifications by topic don't track the notifications
+        of other topics, so their lag is counted from the first notification they
+        would process, if any.
+        """
+        max_notification_ids = {
+            leader_name: leader_app.recorder.max_notification_id() or 0
+            for leader_name, leader_app in leader_apps.items()
+        }
+        lags = {}
+        for follower_app in follower_apps:
+            lag = 0
+            for leader_name in system.follows[follower_app.name]:
+                position = follower_app.recorder.max_tracking_id(leader_name) or 0
+                if max_notification_ids[leader_name] <= position:
+                    continue
+                if follower_app.topics:
+                    leader_recorder = leader_apps[leader_name].recorder
+                    notifications = leader_recorder.select_notifications(
+                        start=position,
+                        limit=1,
+                        topics=follower_app.topics,
+                        inclusive_of_start=False,
+                    )
+                    if not notifications:
+                        continue
+                    position = notifications[0].id - 1
+                lag += max_notification_ids[leader_name] - position
+            lags[follower_app.name] = lag
+        return lags
+
+    def _print_lags(self, lags: Mapping[str, int]) -> None:
+        if not self.is_verbose or not any(lags.values()):
+            return
+
+        self.stdout.write(
+            "Lag: "
+            + ", ".join(
+                f"{follower} {lag} notification{'' if lag == 1 else 's'}"
+                for follower, lag in lags.items()
+            )
+        )
+
+    def _sync_sequentially(
+        self,
+        system: System,
+        follower_apps_by_alias: Mapping[
+            Optional[str], List[Tuple[int, Follower[UUID | str]]]
+        ],
+        print_app_label: Callable[[int, str], None],
+    ) -> None:
         for alias, follower_apps in follower_apps_by_alias.items():
             try:
-                with transaction.atomic(using=alias):
+                with self._atomic(alias):
                     for position, follower_app in follower_apps:
-                        _print_app_label(position, follower_app.name)
+                        print_app_label(position, follower_app.name)
                         try:
-                            events_count = sync_follower_with_leaders(
-                                follower_app, system.follows[follower_app.name]
+                            events_count = self._sync_follower(
+                                alias, follower_app, system.follows[follower_app.name]
                             )
-                        except (
-                            EmptyResultSet,
-                            EventSourcingError,
-                            FieldDoesNotExist,
-                            FieldError,
-                            MultipleObjectsReturned,
-                            ObjectDoesNotExist,
-                        ) as error:
-                            self._print_sync_failure(error)
+                        except SYNC_ERRORS as error:
+                            self._print_sync_failure(follower_app.name, error)
                         else:
                             self._print_sync_success(events_count)
 
@@ -227,11 +658,128 @@ class Command(BaseCommand):
             except DryRun:
                 pass
 
-        if self.is_printing and self.has_failures and not self.is_verbose:
-            self.stderr.write(
-                "There were errors during synchronisation, please re-run with a higher"
-                " verbosity level (try: `--verbosity 2`)."
-            )
+    def _sync_concurrently(
+        self,
+        jobs: int,
+        system: System,
+        follower_apps_by_alias: Mapping[
+            Optional[str], List[Tuple[int, Follower[UUID | str]]]
+        ],
+        print_app_label: Callable[[int, str], None],
+    ) -> None:
+        units = self._get_units(system, follower_apps_by_alias)
+        results: Dict[int, Future[Dict[int, Dict[str, int] | Exception]]] = {}
+        labels: Dict[int, str] = {}
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            for unit in units:
+                future = executor.submit(
+                    self._sync_followers_in_transactions, system, unit
+                )
+                for _, position, follower_app in unit:
+                    results[position] = future
+                    labels[position] = follower_app.name
+
+            # Print the results in the order of the selection, whatever
+            # the order in which the followers finish synchronizing.
+            for position in sorted(results):
+                print_app_label(position, labels[position])
+                result = results[position].result()[position]
+                if isinstance(result, Exception):
+                    self._print_sync_failure(labels[position], result)
+                else:
+                    self._print_sync_success(result)
+
+    @staticmethod
+    def _get_units(
+        system: System,
+        follower_apps_by_alias: Mapping[
+            Optional[str], List[Tuple[int, Follower[UUID | str]]]
+        ],
+    ) -> List[List[Tuple[Optional[str], int, Follower[UUID | str]]]]:
+        """Groups the followers into units that can be synchronized concurrently.
+
+        A follower and the selected apps it follows, directly or not, are in one
+        unit, leaders first, so that the follower processes the events that its
+        leaders process in the same run. SQLite databases only allow one writer
+        at a time, so the followers of a SQLite database are in one unit too.
+        Otherwise, each follower is in a unit of its own.
+        """
+        items = {
+            follower_app.name: (alias, position, follower_app)
+            for alias, follower_apps in follower_apps_by_alias.items()
+            for position, follower_app in follower_apps
+        }
+        parents = {name: name for name in items}
+
+        def find(name: str) -> str:
+            while parents[name] != name:
+                name = parents[name]
+            return name
+
+        def join(name: str, other_name: str) -> None:
+            parents[find(name)] = find(other_name)
+
+        sqlite_followers: Dict[Optional[str], str] = {}
+        for name, (alias, _, _) in items.items():
+            for leader_name in upstream_apps(system, name) & items.keys():
+                join(name, leader_name)
+            if connections[alias or DEFAULT_DB_ALIAS].vendor == "sqlite":
+                join(name, sqlite_followers.setdefault(alias, name))
+
+        units: Dict[str, List[Tuple[Optional[str], int, Follower[UUID | str]]]] = (
+            defaultdict(list)
+        )
+        for name in topological_order(system):
+            if name in items:
+                units[find(name)].append(items[name])
+        return list(units.values())
+
+    def _sync_followers_in_transactions(
+        self,
+        system: System,
+        follower_apps: List[Tuple[Optional[str], int, Follower[UUID | str]]],
+    ) -> Dict[int, Dict[str, int] | Exception]:
+        results: Dict[int, Dict[str, int] | Exception] = {}
+        try:
+            for alias, position, follower_app in follower_apps:
+                try:
+                    with self._atomic(alias):
+                        results[position] = self._sync_follower(
+                            alias, follower_app, system.follows[follower_app.name]
+                        )
+                        if self.is_dry_run:
+                            raise DryRun
+                except DryRun:
+                    pass
+                except SYNC_ERRORS as error:
+                    results[position] = error
+        finally:
+            # Each thread has its own database connections.
+            connections.close_all()
+        return results
+
+    def _atomic(self, alias: Optional[str]) -> ContextManager[Any]:
+        # With --commit-every, the changes are committed by sync_follower_with_leaders.
+        if self.commit_every is not None:
+            return nullcontext()
+        return transaction.atomic(using=alias)
+
+    def _sync_follower(
+        self,
+        alias: Optional[str],
+        follower_app: Follower[UUID | str],
+        leader_names: Iterable[str],
+    ) -> Dict[str, int]:
+        return sync_follower_with_leaders(
+            follower_app,
+            leader_names,
+            max_events=self.max_events,
+            deadline=self.deadline,
+            commit_every=self.commit_every,
+            using=alias,
+            stopping=self.stopping,
+            batch=self.batch_inserts,
+        )
 
     def _print_header(self, followers_count: int, is_complete_selection: bool) -> None:
         if not self.is_printing:
@@ -274,6 +822,8 @@ class Command(BaseCommand):
         return printer
 
     def _print_sync_success(self, events_count: Mapping[str, int]) -> None:
+        self.round_events_count += sum(events_count.values())
+
         if not self.is_printing:
             return
 
@@ -281,6 +831,10 @@ class Command(BaseCommand):
             success_msg = self.style.WARNING("OK (dry-run)")
         else:
             success_msg = self.style.SUCCESS("OK")
+        if self.max_events is not None and (
+            sum(events_count.values()) >= self.max_events
+        ):
+            success_msg += self.style.WARNING(" (event limit reached)")
         self.stdout.write(success_msg)
 
         self._print_sync_success_details(events_count)
@@ -295,8 +849,9 @@ class Command(BaseCommand):
                 f"from {upstream_app} processed"
             )
 
-    def _print_sync_failure(self, error: EventSourcingError) -> None:
-        self.has_failures = True
+    def _print_sync_failure(self, follower: str, error: Exception) -> None:
+        # In follow mode, a follower that fails in many rounds is counted once.
+        self.failed_followers.add(follower)
 
         if not self.is_printing:
             return
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 5.1.15 on 2026-10-17 04:15
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eventsourcing_django", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="TrackingPositionRecord",
+            fields=[
+                ("uid", models.BigAutoField(primary_key=True, serialize=False)),
+                ("application_name", models.CharField(max_length=32)),
+                ("upstream_application_name", models.CharField(max_length=32)),
+                ("notification_id", models.BigIntegerField()),
+            ],
+            options={
+                "db_table": "tracking_positions",
+                "unique_together": {("application_name", "upstream_application_name")},
+            },
+        ),
+    ]
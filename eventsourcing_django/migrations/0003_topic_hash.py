@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 5.1.15 on 2026-10-17 04:18
+from __future__ import annotations
+
+from hashlib import blake2b
+from typing import Any
+
+from django.db import migrations, models, transaction
+
+BATCH_SIZE = 10000
+
+
+def hash_to_bigint(value: str) -> int:
+    return int.from_bytes(
+        blake2b(value.encode(), digest_size=8).digest(), byteorder="big", signed=True
+    )
+
+
+def backfill_topic_hashes(apps: Any, schema_editor: Any) -> None:
+    # Update the stored events in batches of IDs, with one UPDATE statement
+    # for each topic in a batch, so that large tables aren't updated row by row.
+    # Each batch is committed in its own transaction (the migration isn't atomic),
+    # so that rows aren't locked until the whole table has been updated.
+    StoredEventRecord = apps.get_model("eventsourcing_django", "StoredEventRecord")
+    alias = schema_editor.connection.alias
+    records = StoredEventRecord.objects.using(alias)
+    start = 0
+    while True:
+        ids = records.filter(id__gt=start).order_by("id").values_list("id", flat=True)
+        batch_ids = list(ids[:BATCH_SIZE])
+        if not batch_ids:
+            break
+        stop = batch_ids[-1]
+        batch = records.filter(id__gt=start, id__lte=stop, topic_hash__isnull=True)
+        with transaction.atomic(using=alias):
+            for topic in set(batch.values_list("topic", flat=True)):
+                batch.filter(topic=topic).update(topic_hash=hash_to_bigint(topic))
+        start = stop
+
+
+class AddIndexConcurrentlyOnPostgres(migrations.AddIndex):
+    # On PostgreSQL, the index is built without blocking writes to the table
+    # (which requires the migration not to be atomic). The contrib.postgres
+    # module is only imported for PostgreSQL, since it needs psycopg.
+
+    def database_forwards(
+        self, app_label: str, schema_editor: Any, from_state: Any, to_state: Any
+    ) -> None:
+        self._operation(schema_editor).database_forwards(
+            app_label, schema_editor, from_state, to_state
+        )
+
+    def database_backwards(
+        self, app_label: str, schema_editor: Any, from_state: Any, to_state: Any
+    ) -> None:
+        self._operation(schema_editor).database_backwards(
+            app_label, schema_editor, from_state, to_state
+        )
+
+    def _operation(self, schema_editor: Any) -> migrations.AddIndex:
+        if schema_editor.connection.vendor == "postgresql":
+            from django.contrib.postgres.operations import AddIndexConcurrently
+
+            return AddIndexConcurrently(self.model_name, self.index)
+        return migrations.AddIndex(self.model_name, self.index)
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ("eventsourcing_django", "0002_trackingpositionrecord"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="storedeventrecord",
+            name="topic_hash",
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.RunPython(backfill_topic_hashes, migrations.RunPython.noop),
+        AddIndexConcurrentlyOnPostgres(
+            model_name="storedeventrecord",
+            index=models.Index(
+                fields=["application_name", "topic_hash", "id"],
+                name="stored_events_topic_hash_idx",
+            ),
+        ),
+    ]
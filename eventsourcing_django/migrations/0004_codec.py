@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+# Generated by Django 5.1.15 on 2026-10-17 04:45
+from __future__ import annotations
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("eventsourcing_django", "0003_topic_hash"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="snapshotrecord",
+            name="codec",
+            field=models.CharField(max_length=8, null=True),
+        ),
+        migrations.AddField(
+            model_name="storedeventrecord",
+            name="codec",
+            field=models.CharField(max_length=8, null=True),
+        ),
+    ]
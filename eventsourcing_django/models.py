@@ -1,8 +1,17 @@
 # -*- coding: utf-8 -*-
+from __future__ import annotations
+
+import re
+from hashlib import blake2b
+from typing import Any, List, Tuple, Type, TypeVar
+
+from django.apps import apps
 from django.db import models
 
+TModel = TypeVar("TModel", bound=models.Model)
 
-class StoredEventRecord(models.Model):
+
+class AbstractStoredEventRecord(models.Model):
     id = models.BigAutoField(primary_key=True)
 
     # Application name.
@@ -20,15 +29,32 @@ class StoredEventRecord(models.Model):
     # State of the item (serialized dict, possibly encrypted).
     state = models.BinaryField()
 
+    # Codec of the state, if the state was compressed by the recorder.
+    codec = models.CharField(max_length=8, null=True)
+
+    # Signed 64-bit hash of the topic (for selecting notifications by topic).
+    topic_hash = models.BigIntegerField(null=True)
+
     class Meta:
+        abstract = True
         unique_together = (
             ("application_name", "originator_id", "originator_version"),
             ("application_name", "id"),
         )
+
+
+class StoredEventRecord(AbstractStoredEventRecord):
+    class Meta(AbstractStoredEventRecord.Meta):
+        indexes = [
+            models.Index(
+                fields=["application_name", "topic_hash", "id"],
+                name="stored_events_topic_hash_idx",
+            ),
+        ]
         db_table = "stored_events"
 
 
-class SnapshotRecord(models.Model):
+class AbstractSnapshotRecord(models.Model):
     uid = models.BigAutoField(primary_key=True)
 
     # Application name.
@@ -46,8 +72,16 @@ class SnapshotRecord(models.Model):
     # State of the item (serialized dict, possibly encrypted).
     state = models.BinaryField()
 
+    # Codec of the state, if the state was compressed by the recorder.
+    codec = models.CharField(max_length=8, null=True)
+
     class Meta:
+        abstract = True
         unique_together = (("application_name", "originator_id", "originator_version"),)
+
+
+class SnapshotRecord(AbstractSnapshotRecord):
+    class Meta(AbstractSnapshotRecord.Meta):
         db_table = "snapshots"
 
 
@@ -72,3 +106,97 @@ class NotificationTrackingRecord(models.Model):
             ),
         )
         db_table = "notification_tracking"
+
+
+class TrackingPositionRecord(models.Model):
+    uid = models.BigAutoField(primary_key=True)
+
+    # Application name.
+    application_name = models.CharField(max_length=32)
+
+    # Upstream application name.
+    upstream_application_name = models.CharField(max_length=32)
+
+    # Notification ID (the latest position in the upstream notification log).
+    notification_id = models.BigIntegerField()
+
+    class Meta:
+        unique_together = (("application_name", "upstream_application_name"),)
+        db_table = "tracking_positions"
+
+
+# Models created for applications, which are registered with the admin site.
+application_models: List[Type[models.Model]] = []
+
+
+def application_table_name(table: str, application_name: str) -> str:
+    """Returns the name of the table of an application, e.g. "stored_events_myapp"."""
+    return f"{table}_{re.sub(r'[^0-9a-z]+', '_', application_name.lower())}"
+
+
+def create_application_models(
+    app_label: str, application_name: str
+) -> Tuple[Type[AbstractStoredEventRecord], Type[AbstractSnapshotRecord]]:
+    """
+    Returns a stored event model and a snapshot model for an application, with their
+    own tables, e.g. "stored_events_myapp" and "snapshots_myapp", which are created in
+    the given Django app if they don't already exist. Call this in the "models.py"
+    module of the Django app, so that "makemigrations" generates migrations for the
+    tables of the application.
+    """
+    name = re.sub(r"\W", "", application_name)
+    name = name[0].upper() + name[1:] if name else "Application"
+    stored_event_model = _create_model(
+        app_label,
+        f"{name}StoredEventRecord",
+        AbstractStoredEventRecord,
+        application_table_name(StoredEventRecord._meta.db_table, application_name),
+        indexes=[
+            models.Index(
+                fields=["application_name", "topic_hash", "id"],
+                # Index names can't be longer than 30 characters.
+                name="se_"
+                + blake2b(
+                    f"{app_label}.{application_name}".encode(), digest_size=8
+                ).hexdigest()
+                + "_th",
+            ),
+        ],
+    )
+    snapshot_model = _create_model(
+        app_label,
+        f"{name}SnapshotRecord",
+        AbstractSnapshotRecord,
+        application_table_name(SnapshotRecord._meta.db_table, application_name),
+    )
+    return stored_event_model, snapshot_model
+
+
+def _create_model(
+    app_label: str,
+    model_name: str,
+    base: Type[TModel],
+    db_table: str,
+    **meta_options: Any,
+) -> Type[TModel]:
+    try:
+        model = apps.get_registered_model(app_label, model_name)
+    except LookupError:
+        meta = type(
+            "Meta",
+            (),
+            dict(
+                app_label=app_label,
+                db_table=db_table,
+                unique_together=base._meta.unique_together,
+                **meta_options,
+            ),
+        )
+        model = type(
+            model_name,
+            (base,),
+            {"__module__": f"{app_label}.models", "Meta": meta},
+        )
+        application_models.append(model)
+    assert issubclass(model, base)
+    return model
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+PostgreSQL LIST partitioning of stored events tables by application name.
+
+A stored events table is converted into a partitioned table by renaming the existing
+table, and attaching it as the default partition of a new partitioned table, so that
+existing rows aren't copied. Partitions are created by the partition_stored_events
+command, rather than by the recorders, since creating a partition locks the table. The
+rows of existing applications can be moved from the default partition into their own
+partitions, and empty partitions can be created for new applications.
+"""
+
+from __future__ import annotations
+
+from hashlib import blake2b
+from typing import TYPE_CHECKING
+
+from django.db import IntegrityError, transaction
+
+if TYPE_CHECKING:
+    from typing import Any, Optional
+
+    from django.db import ConnectionProxy
+
+# Maximum length of PostgreSQL identifiers.
+MAX_NAME_LENGTH = 63
+
+
+def quote_literal(value: str) -> str:
+    # Partition bounds can't be given as query parameters.
+    return "'" + value.replace("'", "''") + "'"
+
+
+def partition_name(table: str, application_name: str) -> str:
+    """Returns the name of the partition of a table for an application."""
+    name = f"{table}_{application_name}"
+    # Long names, and the name of the default partition, are replaced with a digest.
+    if len(name.encode()) > MAX_NAME_LENGTH or name == default_partition_name(table):
+        digest = blake2b(application_name.encode(), digest_size=8).hexdigest()
+        name = f"{table[:40]}_{digest}"
+    return name
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+def is_partitioned(connection: ConnectionProxy, table: str) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)",
+            [connection.ops.quote_name(table)],
+        )
+        row = cursor.fetchone()
+    return row is not None and row[0] == "p"
+
+
+def table_exists(connection: ConnectionProxy, table: str) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT to_regclass(%s) IS NOT NULL", [connection.ops.quote_name(table)]
+        )
+        return bool(cursor.fetchone()[0])
+
+
+def partition_table(connection: ConnectionProxy, table: str) -> bool:
+    """
+    Converts a stored events table into a table that is partitioned by application
+    name, with the existing table as its default partition. Returns False if the
+    table is already partitioned. Must be called in a transaction.
+
+    The notification IDs continue from the same sequence. Since the primary key of
+    a partitioned table must include the partition key, the primary key of the
+    partitioned table is the application name and the notification ID.
+    """
+    if is_partitioned(connection, table):
+        return False
+    qn = connection.ops.quote_name
+    default_partition = default_partition_name(table)
+    sequence = f"{table}_id_seq"
+    with connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {qn(table)} IN ACCESS EXCLUSIVE MODE")
+        cursor.execute(f"SELECT COALESCE(MAX(id), 0) + 1 FROM {qn(table)}")
+        next_id = cursor.fetchone()[0]
+        # The notification IDs of all the partitions are given by one sequence.
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ALTER COLUMN id DROP IDENTITY IF EXISTS"
+        )
+        cursor.execute(f"ALTER TABLE {qn(table)} ALTER COLUMN id DROP DEFAULT")
+        cursor.execute(f"ALTER TABLE {qn(table)} RENAME TO {qn(default_partition)}")
+        cursor.execute(f"CREATE SEQUENCE IF NOT EXISTS {qn(sequence)} AS bigint")
+        cursor.execute(
+            "SELECT setval(%s::regclass, %s, false)", [qn(sequence), next_id]
+        )
+        cursor.execute(
+            f"CREATE TABLE {qn(table)} (LIKE {qn(default_partition)}) "
+            "PARTITION BY LIST (application_name)"
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ALTER COLUMN id "
+            f"SET DEFAULT nextval({quote_literal(qn(sequence))})"
+        )
+        cursor.execute(f"ALTER SEQUENCE {qn(sequence)} OWNED BY {qn(table)}.id")
+        # The indexes of the existing table are attached to these indexes.
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ADD CONSTRAINT {qn(table + '_partitioned_pkey')} "
+            "PRIMARY KEY (application_name, id)"
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} "
+            f"ADD CONSTRAINT {qn(table + '_partitioned_version_uniq')} "
+            "UNIQUE (application_name, originator_id, originator_version)"
+        )
+        if has_column(cursor, default_partition, "topic_hash"):
+            cursor.execute(
+                f"CREATE INDEX {qn(table + '_partitioned_topic_hash_idx')} "
+                f"ON {qn(table)} (application_name, topic_hash, id)"
+            )
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} "
+            f"ATTACH PARTITION {qn(default_partition)} DEFAULT"
+        )
+    return True
+
+
+def has_column(cursor: Any, table: str, column: str) -> bool:
+    cursor.execute(
+        "SELECT 1 FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = %s "
+        "AND column_name = %s",
+        [table, column],
+    )
+    return cursor.fetchone() is not None
+
+
+def get_partition(
+    connection: ConnectionProxy, table: str, application_name: str
+) -> Optional[str]:
+    """
+    Returns the name of the partition that has the rows of an application, which
+    is the default partition unless a partition has been created for the
+    application. Returns None if the table isn't partitioned.
+    """
+    if not is_partitioned(connection, table):
+        return None
+    partition = partition_name(table, application_name)
+    if table_exists(connection, partition):
+        return partition
+    return default_partition_name(table)
+
+
+def create_partition(
+    connection: ConnectionProxy, table: str, application_name: str
+) -> bool:
+    """
+    Creates an empty partition for an application that doesn't have rows in the
+    default partition. Returns False if the default partition has rows of the
+    application, which need to be moved instead. Must not be called in a
+    transaction.
+
+    Attaching a partition locks the partitioned table and its default partition,
+    and PostgreSQL scans the default partition for rows that belong in the new
+    partition, unless a constraint of the default partition excludes them. So a
+    CHECK constraint that excludes the application is added to the default
+    partition, and validated without blocking writes, before the partition is
+    created. Events of the application can't be inserted until the partition has
+    been created.
+    """
+    assert not connection.in_atomic_block
+    partition = partition_name(table, application_name)
+    qn = connection.ops.quote_name
+    default_partition = default_partition_name(table)
+    constraint = qn(
+        "exclude_" + blake2b(application_name.encode(), digest_size=8).hexdigest()
+    )
+    with transaction.atomic(using=connection.alias):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT 1 FROM {qn(default_partition)} "
+                "WHERE application_name = %s LIMIT 1",
+                [application_name],
+            )
+            if cursor.fetchone() is not None:
+                return False
+            cursor.execute(
+                f"ALTER TABLE {qn(default_partition)} ADD CONSTRAINT {constraint} "
+                f"CHECK (application_name <> {quote_literal(application_name)}) "
+                "NOT VALID"
+            )
+    try:
+        try:
+            # Scans the default partition, without blocking reads and writes.
+            with transaction.atomic(using=connection.alias):
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        f"ALTER TABLE {qn(default_partition)} "
+                        f"VALIDATE CONSTRAINT {constraint}"
+                    )
+        except IntegrityError:
+            # Rows of the application were inserted before the constraint was added.
+            return False
+        # The default partition isn't scanned, since the constraint excludes the rows.
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"CREATE TABLE {qn(partition)} PARTITION OF {qn(table)} "
+                    f"FOR VALUES IN ({quote_literal(application_name)})"
+                )
+    finally:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"ALTER TABLE {qn(default_partition)} "
+                    f"DROP CONSTRAINT IF EXISTS {constraint}"
+                )
+    return True
+
+
+def move_to_partition(
+    connection: ConnectionProxy, table: str, application_name: str
+) -> int:
+    """
+    Moves the rows of an application from the default partition of a table into a
+    new partition for the application, and returns the number of rows moved. Writes
+    to the table are blocked until the transaction ends. Must be called in a
+    transaction.
+    """
+    partition = partition_name(table, application_name)
+    if table_exists(connection, partition):
+        return 0
+    qn = connection.ops.quote_name
+    default_partition = default_partition_name(table)
+    with connection.cursor() as cursor:
+        cursor.execute(f"LOCK TABLE {qn(table)} IN EXCLUSIVE MODE")
+        cursor.execute(
+            f"CREATE TABLE {qn(partition)} "
+            f"(LIKE {qn(table)} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+        )
+        cursor.execute(
+            f"INSERT INTO {qn(partition)} SELECT * FROM {qn(default_partition)} "
+            "WHERE application_name = %s",
+            [application_name],
+        )
+        moved_count = cursor.rowcount
+        cursor.execute(
+            f"DELETE FROM {qn(default_partition)} WHERE application_name = %s",
+            [application_name],
+        )
+        cursor.execute(
+            f"ALTER TABLE {qn(table)} ATTACH PARTITION {qn(partition)} "
+            f"FOR VALUES IN ({quote_literal(application_name)})"
+        )
+    return moved_count
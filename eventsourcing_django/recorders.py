@@ -1,15 +1,26 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+import re
+import select
+from collections import OrderedDict
 from contextlib import contextmanager
-from functools import wraps
-from threading import Lock
+from dataclasses import dataclass
+from functools import partial, wraps
+from hashlib import blake2b
+from inspect import iscoroutinefunction
+from itertools import count
+from threading import Event, Lock, Thread, local
+from time import monotonic
 from typing import TYPE_CHECKING, Sequence
 from uuid import UUID
+from weakref import WeakKeyDictionary
 
 import django.db
-from django.db import models, transaction
+from asgiref.sync import sync_to_async
+from django.db import DEFAULT_DB_ALIAS, connections, models, transaction
 from django.db.backends.signals import connection_created
+from django.db.models.functions import Coalesce, RowNumber
 from django.db.transaction import get_connection
 from eventsourcing.persistence import (
     AggregateRecorder,
@@ -19,26 +30,116 @@ from eventsourcing.persistence import (
     IntegrityError,
     InterfaceError,
     InternalError,
+    ListenNotifySubscription,
     Notification,
     NotSupportedError,
     OperationalError,
     PersistenceError,
     ProcessRecorder,
     ProgrammingError,
+    Recorder,
     StoredEvent,
     Subscription,
     Tracking,
+    TrackingRecorder,
 )
 
-from eventsourcing_django.models import NotificationTrackingRecord
+from eventsourcing_django.compression import check_codec, decode_state, encode_state
+from eventsourcing_django.models import (
+    NotificationTrackingRecord,
+    TrackingPositionRecord,
+)
+from eventsourcing_django.partitioning import (
+    default_partition_name,
+    get_partition,
+)
 
 if TYPE_CHECKING:
-    from typing import Any, Dict, Iterator, List, Optional, Type
+    from typing import (
+        Any,
+        Callable,
+        Dict,
+        Hashable,
+        Iterable,
+        Iterator,
+        List,
+        Optional,
+        Set,
+        Tuple,
+        Type,
+    )
 
     from django.db import ConnectionProxy
 
 journal_modes: Dict[str, str] = {}
 
+SELECT_EVENTS_FIELDS = ("originator_id", "originator_version", "topic", "state")
+NOTIFICATION_HEADER_FIELDS = ("id", "originator_id", "originator_version", "topic")
+
+
+@dataclass(frozen=True)
+class NotificationHeader:
+    """The metadata of a notification, without its state."""
+
+    id: int
+    originator_id: UUID
+    originator_version: int
+    topic: str
+
+
+# Ways of serializing transactions that insert stored events on PostgreSQL.
+LOCK_MODE_NONE = "none"
+LOCK_MODE_ADVISORY = "advisory"
+LOCK_MODE_TABLE = "table"
+LOCK_MODES = (LOCK_MODE_NONE, LOCK_MODE_ADVISORY, LOCK_MODE_TABLE)
+
+
+def hash_to_bigint(value: str) -> int:
+    """Returns a signed 64-bit hash of the given string."""
+    return int.from_bytes(
+        blake2b(value.encode(), digest_size=8).digest(), byteorder="big", signed=True
+    )
+
+
+# Names of the statements that have been prepared on each PostgreSQL connection.
+prepared_statements: WeakKeyDictionary[Any, Set[str]] = WeakKeyDictionary()
+prepared_statements_lock = Lock()
+
+
+def execute_prepared(
+    connection: ConnectionProxy, cursor: Any, sql: str, params: List[Any]
+) -> None:
+    """Executes SQL on PostgreSQL as a server-side prepared statement, which is
+    prepared the first time it is executed on the database connection.
+    """
+    if connection.settings_dict["OPTIONS"].get("server_side_binding") is True:
+        # Parameters are bound by the server, so psycopg can prepare the statement.
+        with connection.wrap_database_errors:
+            cursor.cursor.execute(sql, params, prepare=True)
+        return
+    name = "eventsourcing_" + blake2b(sql.encode(), digest_size=8).hexdigest()
+    with prepared_statements_lock:
+        names = prepared_statements.setdefault(connection.connection, set())
+    if name not in names:
+        # Prepared statements have numbered parameters. Statements are prepared
+        # for the session, even if the current transaction is rolled back.
+        numbers = count(1)
+        sql = re.sub(
+            r"%s|%%",
+            lambda m: f"${next(numbers)}" if m.group() == "%s" else "%",
+            sql,
+        )
+        cursor.execute(f"PREPARE {name} AS {sql}")
+        names.add(name)
+    if params:
+        cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+    else:
+        cursor.execute(f"EXECUTE {name}")
+
+
+def has_codec_field(model: Type[models.Model]) -> bool:
+    return any(field.name == "codec" for field in model._meta.concrete_fields)
+
 
 def detect_sqlite(connection: ConnectionProxy) -> bool:
     return connection.vendor == "sqlite"
@@ -67,44 +168,140 @@ def set_journal_mode_wal_on_sqlite_file_db(
 connection_created.connect(set_journal_mode_wal_on_sqlite_file_db)
 
 
+@contextmanager
+def reraise_django_errors() -> Iterator[None]:
+    try:
+        yield
+    except django.db.InterfaceError as e:
+        raise InterfaceError(e) from e
+    except django.db.DataError as e:
+        raise DataError(e) from e
+    except django.db.OperationalError as e:
+        raise OperationalError(e) from e
+    except django.db.IntegrityError as e:
+        raise IntegrityError(e) from e
+    except django.db.InternalError as e:
+        raise InternalError(e) from e
+    except django.db.ProgrammingError as e:
+        raise ProgrammingError(e) from e
+    except django.db.NotSupportedError as e:
+        raise NotSupportedError(e) from e
+    except django.db.DatabaseError as e:
+        raise DatabaseError(e) from e
+    except django.db.Error as e:
+        raise PersistenceError(e) from e
+
+
 def errors(f: Any) -> Any:
+    if iscoroutinefunction(f):
+
+        @wraps(f)
+        async def _async_wrapper(*args: Any, **kwargs: Any) -> Any:
+            with reraise_django_errors():
+                return await f(*args, **kwargs)
+
+        return _async_wrapper
+
     @wraps(f)
     def _wrapper(*args: Any, **kwargs: Any) -> Any:
-        try:
+        with reraise_django_errors():
             return f(*args, **kwargs)
-        except django.db.InterfaceError as e:
-            raise InterfaceError(e) from e
-        except django.db.DataError as e:
-            raise DataError(e) from e
-        except django.db.OperationalError as e:
-            raise OperationalError(e) from e
-        except django.db.IntegrityError as e:
-            raise IntegrityError(e) from e
-        except django.db.InternalError as e:
-            raise InternalError(e) from e
-        except django.db.ProgrammingError as e:
-            raise ProgrammingError(e) from e
-        except django.db.NotSupportedError as e:
-            raise NotSupportedError(e) from e
-        except django.db.DatabaseError as e:
-            raise DatabaseError(e) from e
-        except django.db.Error as e:
-            raise PersistenceError(e) from e
 
     return _wrapper
 
 
-class DjangoAggregateRecorder(AggregateRecorder):
+class StoredEventCache:
+    """
+    Size-bounded LRU cache of the stored events of recently selected originators.
+
+    Each entry holds the stored events of one originator, after a "base" version
+    (or all its stored events, if the base is None), in ascending order of version.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[UUID, Tuple[Optional[int], List[StoredEvent]]] = (
+            OrderedDict()
+        )
+        self._lock = Lock()
+
+    def get(
+        self, originator_id: UUID, gt: Optional[int]
+    ) -> Optional[Tuple[Optional[int], List[StoredEvent]]]:
+        """
+        Returns the cached events of the originator, if they include all
+        the events after version "gt", otherwise returns None.
+        """
+        with self._lock:
+            entry = self._entries.get(originator_id)
+            if entry is None or not (
+                entry[0] is None or (gt is not None and gt >= entry[0])
+            ):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(originator_id)
+            self.hits += 1
+            return entry[0], list(entry[1])
+
+    def put(
+        self, originator_id: UUID, base: Optional[int], events: List[StoredEvent]
+    ) -> None:
+        with self._lock:
+            self._entries[originator_id] = (base, list(events))
+            self._entries.move_to_end(originator_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def extend(self, originator_id: UUID, events: Sequence[StoredEvent]) -> None:
+        """
+        Appends events to a cached entry. Since other processes may have recorded
+        events in the meantime, the entry is discarded unless the versions follow
+        on without a gap from the last cached version.
+        """
+        with self._lock:
+            entry = self._entries.get(originator_id)
+            if entry is None:
+                return
+            base, cached = entry
+            last = cached[-1].originator_version if cached else base
+            for event in events:
+                if last is not None and event.originator_version <= last:
+                    continue
+                if last is None or event.originator_version != last + 1:
+                    del self._entries[originator_id]
+                    return
+                cached.append(event)
+                last = event.originator_version
+
+    def invalidate(self, originator_id: Optional[UUID] = None) -> None:
+        """
+        Discards the cached events of the given originator, or of all originators.
+        """
+        with self._lock:
+            if originator_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(originator_id, None)
+
+
+class DjangoRecorder(Recorder):
     def __init__(
         self,
         application_name: str,
         model: Type[models.Model],
         using: Optional[str] = None,
+        prepared_statements: bool = False,
     ):
         super().__init__()
         self.application_name = application_name
         self.model = model
         self.using = using
+        self.prepared_statements = prepared_statements
+        self._statements: Dict[Tuple[str, Hashable], str] = {}
         connection = get_connection(using=self.using)
 
         self.lock: Optional[Lock]
@@ -123,6 +320,106 @@ class DjangoAggregateRecorder(AggregateRecorder):
             if self.lock:
                 self.lock.release()
 
+    def _uses_prepared_statements(self, connection: ConnectionProxy) -> bool:
+        return self.prepared_statements and connection.vendor == "postgresql"
+
+    def _fetch_rows(
+        self,
+        shape: Hashable,
+        get_queryset: Callable[[], models.QuerySet[Any]],
+        params: List[Any],
+        using: Optional[str] = None,
+    ) -> List[Tuple[Any, ...]]:
+        # Selects rows with a cursor, without constructing model instances. The
+        # SQL is compiled by the ORM once for each "shape" of query and database,
+        # and reused.
+        connection = get_connection(using=using or self.using)
+        key = (connection.alias, shape)
+        try:
+            sql = self._statements[key]
+        except KeyError:
+            sql, compiled_params = (
+                get_queryset().query.get_compiler(connection=connection).as_sql()
+            )
+            if list(compiled_params) == params:
+                self._statements[key] = sql
+            else:  # pragma: no cover
+                params = list(compiled_params)
+        with connection.cursor() as cursor:
+            if self._uses_prepared_statements(connection):
+                execute_prepared(connection, cursor, sql, params)
+            else:
+                cursor.execute(sql, params)
+            return cursor.fetchall()
+
+
+class DjangoAggregateRecorder(DjangoRecorder, AggregateRecorder):
+    # Aggregate sequences are protected by the unique constraint on
+    # originator ID and version, so there's no need to lock anything.
+    default_lock_mode = LOCK_MODE_NONE
+
+    # Number of originator IDs in each query that selects events of many aggregates.
+    select_events_many_chunk_size = 500
+
+    def __init__(
+        self,
+        application_name: str,
+        model: Type[models.Model],
+        using: Optional[str] = None,
+        raw_select_events: bool = False,
+        lock_mode: Optional[str] = None,
+        event_cache_size: int = 0,
+        prepared_statements: bool = False,
+        snapshot_model: Optional[Type[models.Model]] = None,
+        codec: Optional[str] = None,
+        read_using: Optional[str] = None,
+    ):
+        super().__init__(
+            application_name=application_name,
+            model=model,
+            using=using,
+            prepared_statements=prepared_statements,
+        )
+        self.raw_select_events = raw_select_events
+        self.snapshot_model = snapshot_model
+        self.event_cache = (
+            StoredEventCache(maxsize=event_cache_size) if event_cache_size else None
+        )
+        self.lock_mode = lock_mode or self.default_lock_mode
+        if self.lock_mode not in LOCK_MODES:
+            raise ValueError(
+                f"Unknown lock mode: {self.lock_mode!r}. "
+                f"The lock modes are: {', '.join(LOCK_MODES)}."
+            )
+        self.advisory_lock_key = hash_to_bigint(
+            f"{self.model._meta.db_table}:{self.application_name}"
+        )
+        # Models with a "topic_hash" field have a compact index for filtering by topic.
+        self.has_topic_hashes = any(
+            field.name == "topic_hash" for field in self.model._meta.concrete_fields
+        )
+        # Models with a "codec" field can have compressed states.
+        self.has_codecs = has_codec_field(self.model)
+        check_codec(codec)
+        if codec is not None and not self.has_codecs:
+            raise ValueError(f"Model {self.model.__name__} doesn't have a codec field")
+        self.codec = codec
+        # The partition of the stored events table that has the rows of the
+        # application, or the table itself if the table isn't partitioned.
+        self._partition: Optional[str] = None
+        self._select_events_fields = SELECT_EVENTS_FIELDS + (
+            ("codec",) if self.has_codecs else ()
+        )
+        # Events are selected from the read database (e.g. a replica), unless
+        # it doesn't yet have the events that have been inserted by the recorder.
+        # Events inserted by other processes may not have been replicated yet,
+        # except that events up to a requested version are selected again from
+        # the primary database if the read database doesn't have them.
+        self.read_using = read_using
+        # The highest notification ID inserted by the recorder (when committed).
+        self._max_inserted_id = 0
+        self._max_replicated_id = 0
+
     @errors
     def insert_events(
         self, stored_events: List[StoredEvent], **kwargs: Any
@@ -131,34 +428,137 @@ class DjangoAggregateRecorder(AggregateRecorder):
             with transaction.atomic(using=self.using):
                 self._lock_table()
                 self._insert_events(stored_events, **kwargs)
+                self._extend_event_cache_on_commit(stored_events)
         return None
 
+    def _extend_event_cache_on_commit(self, stored_events: List[StoredEvent]) -> None:
+        # The cached events are only extended if the transaction is committed.
+        if self.event_cache is not None and stored_events:
+            event_cache = self.event_cache
+
+            def extend_event_cache() -> None:
+                originator_ids = {e.originator_id for e in stored_events}
+                for originator_id in originator_ids:
+                    event_cache.extend(
+                        UUID(str(originator_id)),
+                        [e for e in stored_events if e.originator_id == originator_id],
+                    )
+
+            transaction.on_commit(extend_event_cache, using=self.using)
+
     def _lock_table(self) -> None:
+        # Serialize the transactions that insert stored events, so that the insert
+        # order of notification IDs is the same as the commit order, and readers
+        # don't pass over gaps that are filled in later. Since notification logs
+        # are partitioned by application name, it is sufficient to serialize the
+        # writers of one application with a transaction-level advisory lock, rather
+        # than blocking the writers of all applications with an EXCLUSIVE table lock.
+        # If the table is partitioned by application name, only the partition that
+        # has the rows of the application is locked.
         connection = get_connection(using=self.using)
-        if connection.vendor == "postgresql":
-            cursor = connection.cursor()
-            db_table = self.model._meta.db_table
-            cursor.execute(f"LOCK TABLE {db_table} IN EXCLUSIVE MODE")
+        if connection.vendor != "postgresql":
+            return
+        if self.lock_mode == LOCK_MODE_NONE:
+            return
+        with connection.cursor() as cursor:
+            if self.lock_mode == LOCK_MODE_ADVISORY:
+                cursor.execute(
+                    "SELECT pg_advisory_xact_lock(%s)", [self.advisory_lock_key]
+                )
+            else:
+                db_table = connection.ops.quote_name(self._get_partition(connection))
+                cursor.execute(f"LOCK TABLE {db_table} IN EXCLUSIVE MODE")
+
+    def _get_partition(self, connection: ConnectionProxy) -> str:
+        # Finds the partition that has the rows of the application, if the table is
+        # partitioned. Partitions are created by the partition_stored_events command
+        # rather than here, since creating a partition locks the whole table.
+        if self._partition is not None:
+            return self._partition
+        db_table = self.model._meta.db_table
+        partition = get_partition(connection, db_table, self.application_name)
+        if partition is None:
+            # The table isn't partitioned.
+            self._partition = db_table
+            return db_table
+        if partition != default_partition_name(db_table):
+            self._partition = partition
+        # Rows in the default partition may be moved to a new partition later.
+        return partition
 
     def _insert_events(
         self, stored_events: List[StoredEvent], **kwargs: Any
     ) -> Sequence[int]:
-        records = []
-        for stored_event in stored_events:
-            record = self.model(
+        records = [
+            self.model(
                 application_name=self.application_name,
                 originator_id=stored_event.originator_id,
                 originator_version=stored_event.originator_version,
                 topic=stored_event.topic,
                 state=stored_event.state,
             )
-            records.append(record)
-        notification_ids = []
-        for record in records:
-            record.save(using=self.using)
-            if hasattr(record, "id"):
-                notification_ids.append(record.id)
-        return notification_ids
+            for stored_event in stored_events
+        ]
+        if self.has_topic_hashes:
+            for record in records:
+                record.topic_hash = hash_to_bigint(record.topic)
+        if self.codec is not None:
+            for record in records:
+                record.state, record.codec = encode_state(record.state, self.codec)
+        if not records:
+            return []
+        has_notification_ids = hasattr(self.model, "id")
+        connection = get_connection(using=self.using)
+        if has_notification_ids and not (
+            connection.features.can_return_rows_from_bulk_insert
+        ):
+            # Without "RETURNING", the notification IDs are only
+            # known if the records are inserted one at a time.
+            for record in records:
+                record.save(using=self.using, force_insert=True)
+        else:
+            # Insert all the records with one multi-row INSERT statement (which
+            # Django splits into chunks if the database has a limit on the number
+            # of query parameters). The notification IDs are given by "RETURNING".
+            self.model.objects.using(self.using).bulk_create(records)
+        if has_notification_ids:
+            notification_ids = [record.id for record in records]
+            transaction.on_commit(
+                partial(self._set_max_inserted_id, max(notification_ids)),
+                using=self.using,
+            )
+            return notification_ids
+        return []
+
+    def _set_max_inserted_id(self, notification_id: int) -> None:
+        self._max_inserted_id = max(self._max_inserted_id, notification_id)
+
+    def _get_read_alias(self) -> Optional[str]:
+        # Returns the alias of the read database, if it has the events inserted by
+        # the recorder, otherwise the alias of the database the events are inserted
+        # in. Snapshots are always selected from the read database, since older
+        # snapshots are followed by more events.
+        if self.read_using is None or get_connection(using=self.using).in_atomic_block:
+            # Events selected in a transaction may have been inserted by it.
+            return self.using
+        if not hasattr(self.model, "id"):
+            return self.read_using
+        if not self._is_replicated(self._max_inserted_id):
+            return self.using
+        return self.read_using
+
+    def _is_replicated(self, notification_id: int) -> bool:
+        if notification_id > self._max_replicated_id:
+            # Find the events that have been replicated to the read database.
+            max_id = (
+                self.model.objects.using(alias=self.read_using)
+                .filter(application_name=self.application_name)
+                .order_by("-id")
+                .values_list("id", flat=True)
+                .first()
+            )
+            self._max_replicated_id = max(self._max_replicated_id, max_id or 0)
+        return notification_id <= self._max_replicated_id
 
     @errors
     def select_events(
@@ -169,30 +569,314 @@ class DjangoAggregateRecorder(AggregateRecorder):
         desc: bool = False,
         limit: Optional[int] = None,
     ) -> List[StoredEvent]:
+        using = self._get_read_alias()
+        if (
+            self.event_cache is not None
+            and not desc
+            and limit is None
+            and not get_connection(using=self.using).in_atomic_block
+        ):
+            # Events selected inside a transaction may not be committed,
+            # so the cache is only used outside transactions.
+            events = self._select_events_cached(
+                self.event_cache, originator_id, gt, lte, using
+            )
+        else:
+            events = self._select_events(originator_id, gt, lte, desc, limit, using)
+        if using != self.using and self._lacks_events(events, lte, desc, limit):
+            events = self._select_events(
+                originator_id, gt, lte, desc, limit, self.using
+            )
+        return events
+
+    def _lacks_events(
+        self,
+        events: List[StoredEvent],
+        lte: Optional[int],
+        desc: bool,
+        limit: Optional[int],
+    ) -> bool:
+        # Whether events up to version `lte`, which were selected from the read
+        # database, may have been recorded by other processes and not replicated.
+        if lte is None or not hasattr(self.model, "id"):
+            # Older snapshots are followed by more events.
+            return False
+        if not desc and limit is not None and len(events) >= limit:
+            return False
+        if not events:
+            return True
+        return events[0 if desc else -1].originator_version < lte
+
+    @errors
+    def select_events_many(
+        self,
+        originator_ids: Iterable[UUID],
+        gt: Optional[int] = None,
+        lte: Optional[int] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+    ) -> Dict[UUID, List[StoredEvent]]:
+        """
+        Returns the events of each of the given aggregates, in a dict keyed by
+        originator ID, selecting the events of many aggregates with each query.
+        The arguments `gt`, `lte`, `desc`, and `limit` apply to the events of each
+        aggregate, as with `select_events()`. For example, the latest snapshot of
+        each aggregate is selected with `desc=True` and `limit=1`.
+        """
+        stored_events: Dict[UUID, List[StoredEvent]] = {
+            UUID(str(originator_id)): [] for originator_id in originator_ids
+        }
+        ids = list(stored_events)
+        chunk_size = self.select_events_many_chunk_size
+        using = self._get_read_alias()
         with self.serialize():
-            q = self.model.objects.using(alias=self.using).filter(
-                application_name=self.application_name, originator_id=originator_id
+            for i in range(0, len(ids), chunk_size):
+                q = self._select_events_many_queryset(
+                    ids[i : i + chunk_size], gt, lte, desc, limit
+                ).using(using)
+                for row in q:
+                    stored_event = self._stored_event_from_row(row)
+                    originator_id = stored_event.originator_id
+                    assert isinstance(originator_id, UUID)
+                    stored_events[originator_id].append(stored_event)
+        return stored_events
+
+    def _select_events_many_queryset(
+        self,
+        originator_ids: List[UUID],
+        gt: Optional[int],
+        lte: Optional[int],
+        desc: bool,
+        limit: Optional[int],
+    ) -> models.QuerySet[Any]:
+        q = self.model.objects.using(alias=self.using).filter(
+            application_name=self.application_name, originator_id__in=originator_ids
+        )
+        if gt is not None:
+            q = q.filter(originator_version__gt=gt)
+        if lte is not None:
+            q = q.filter(originator_version__lte=lte)
+        order_by = ("" if not desc else "-") + "originator_version"
+        if limit is not None:
+            # Number the events of each aggregate, to apply the limit to each one.
+            q = q.annotate(
+                position=models.Window(
+                    RowNumber(), partition_by="originator_id", order_by=order_by
+                )
+            ).filter(position__lte=limit)
+        q = q.order_by("originator_id", order_by)
+        return q.values_list(*self._select_events_fields)
+
+    @errors
+    def select_snapshot_and_events(
+        self, originator_id: UUID, lte: Optional[int] = None
+    ) -> Tuple[Optional[StoredEvent], List[StoredEvent]]:
+        """
+        Returns the latest snapshot of an aggregate, and the events recorded after
+        the snapshot, in ascending order, with one query. Snapshots and events are
+        only selected up to and including version `lte`, if given. If there isn't
+        a snapshot, or the recorder doesn't have a snapshot model, the snapshot is
+        None and all the events are returned.
+        """
+        if self.snapshot_model is None:
+            return None, self.select_events(originator_id, lte=lte)
+        using = self._get_read_alias()
+        snapshot, events = self._select_snapshot_and_events(originator_id, lte, using)
+        if using != self.using and self._lacks_events(
+            ([snapshot] if snapshot else []) + events, lte, False, None
+        ):
+            snapshot, events = self._select_snapshot_and_events(
+                originator_id, lte, self.using
             )
-            q = q.order_by(("" if not desc else "-") + "originator_version")
-            if gt is not None:
-                q = q.filter(originator_version__gt=gt)
-            if lte is not None:
-                q = q.filter(originator_version__lte=lte)
-            if limit is not None:
-                q = q[0:limit]
-            records = list(q)
-        return [
-            StoredEvent(
-                originator_id=r.originator_id,
-                originator_version=r.originator_version,
-                topic=r.topic,
-                state=bytes(r.state) if isinstance(r.state, memoryview) else r.state,
+        return snapshot, events
+
+    def _select_snapshot_and_events(
+        self, originator_id: UUID, lte: Optional[int], using: Optional[str]
+    ) -> Tuple[Optional[StoredEvent], List[StoredEvent]]:
+        with self.serialize():
+            q = self._select_snapshot_and_events_queryset(originator_id, lte)
+            rows = list(q.using(using))
+        snapshot = None
+        if rows and rows[0][5]:
+            snapshot = self._stored_event_from_row(rows.pop(0)[:5])
+        return snapshot, [self._stored_event_from_row(row[:5]) for row in rows]
+
+    def _select_snapshot_and_events_queryset(
+        self, originator_id: UUID, lte: Optional[int]
+    ) -> models.QuerySet[Any]:
+        assert self.snapshot_model is not None
+        snapshots = self.snapshot_model.objects.using(alias=self.using).filter(
+            application_name=self.application_name, originator_id=originator_id
+        )
+        events = self.model.objects.using(alias=self.using).filter(
+            application_name=self.application_name, originator_id=originator_id
+        )
+        if lte is not None:
+            snapshots = snapshots.filter(originator_version__lte=lte)
+            events = events.filter(originator_version__lte=lte)
+        snapshot_version = models.Subquery(
+            snapshots.order_by("-originator_version").values("originator_version")[:1]
+        )
+        snapshots = snapshots.filter(originator_version=snapshot_version)
+        # Without a snapshot, all the events are selected.
+        events = events.filter(
+            originator_version__gt=Coalesce(
+                snapshot_version,
+                models.Value(-(2**63)),
+                output_field=models.BigIntegerField(),
+            )
+        )
+        # The snapshot is ordered before the events recorded after it.
+        return (
+            self._annotate_codec(snapshots.annotate(is_snapshot=models.Value(True)))
+            .values_list(*SELECT_EVENTS_FIELDS, "state_codec", "is_snapshot")
+            .union(
+                self._annotate_codec(
+                    events.annotate(is_snapshot=models.Value(False))
+                ).values_list(*SELECT_EVENTS_FIELDS, "state_codec", "is_snapshot"),
+                all=True,
+            )
+            .order_by("originator_version")
+        )
+
+    @staticmethod
+    def _annotate_codec(q: models.QuerySet[Any]) -> models.QuerySet[Any]:
+        # Selects the same columns from models with and without a codec field.
+        if has_codec_field(q.model):
+            return q.annotate(state_codec=models.F("codec"))
+        return q.annotate(
+            state_codec=models.Value(None, output_field=models.CharField())
+        )
+
+    def _stored_event_from_row(self, row: Tuple[Any, ...]) -> StoredEvent:
+        # Rows have a fifth column if the model has a codec field.
+        return StoredEvent(
+            originator_id=self.model._meta.get_field("originator_id").to_python(row[0]),
+            originator_version=row[1],
+            topic=row[2],
+            state=decode_state(row[3], row[4] if len(row) > 4 else None),
+        )
+
+    def _select_events_cached(
+        self,
+        event_cache: StoredEventCache,
+        originator_id: UUID,
+        gt: Optional[int],
+        lte: Optional[int],
+        using: Optional[str],
+    ) -> List[StoredEvent]:
+        originator_id = UUID(str(originator_id))
+        entry = event_cache.get(originator_id, gt)
+        if entry is None:
+            events = self._select_events(originator_id, gt, None, False, None, using)
+            event_cache.put(originator_id, gt, events)
+        else:
+            # Only select the events recorded after the last cached event.
+            base, events = entry
+            last = events[-1].originator_version if events else base
+            new_events = self._select_events(
+                originator_id, last, None, False, None, using
             )
-            for r in records
+            event_cache.extend(originator_id, new_events)
+            events += new_events
+        return [
+            e
+            for e in events
+            if (gt is None or e.originator_version > gt)
+            and (lte is None or e.originator_version <= lte)
+        ]
+
+    def _select_events(
+        self,
+        originator_id: UUID,
+        gt: Optional[int],
+        lte: Optional[int],
+        desc: bool,
+        limit: Optional[int],
+        using: Optional[str],
+    ) -> List[StoredEvent]:
+        if self.raw_select_events or self._uses_prepared_statements(
+            get_connection(using=using)
+        ):
+            return self._select_events_raw(originator_id, gt, lte, desc, limit, using)
+        with self.serialize():
+            q = self._select_events_queryset(originator_id, gt, lte, desc, limit)
+            records = list(q.using(using))
+        return [self._stored_event_from_record(r) for r in records]
+
+    @staticmethod
+    def _stored_event_from_record(r: Any) -> StoredEvent:
+        return StoredEvent(
+            originator_id=r.originator_id,
+            originator_version=r.originator_version,
+            topic=r.topic,
+            state=decode_state(r.state, getattr(r, "codec", None)),
+        )
+
+    def _select_events_queryset(
+        self,
+        originator_id: UUID,
+        gt: Optional[int],
+        lte: Optional[int],
+        desc: bool,
+        limit: Optional[int],
+    ) -> models.QuerySet[Any]:
+        q = self.model.objects.using(alias=self.using).filter(
+            application_name=self.application_name, originator_id=originator_id
+        )
+        q = q.order_by(("" if not desc else "-") + "originator_version")
+        if gt is not None:
+            q = q.filter(originator_version__gt=gt)
+        if lte is not None:
+            q = q.filter(originator_version__lte=lte)
+        if limit is not None:
+            q = q[0:limit]
+        return q
+
+    def _select_events_raw(
+        self,
+        originator_id: UUID,
+        gt: Optional[int],
+        lte: Optional[int],
+        desc: bool,
+        limit: Optional[int],
+        using: Optional[str] = None,
+    ) -> List[StoredEvent]:
+        connection = get_connection(using=using or self.using)
+        originator_id_field = self.model._meta.get_field("originator_id")
+        params: List[Any] = [
+            self.application_name,
+            originator_id_field.get_db_prep_value(originator_id, connection),
         ]
+        if gt is not None:
+            params.append(gt)
+        if lte is not None:
+            params.append(lte)
+        with self.serialize():
+            rows = self._fetch_rows(
+                ("select_events", gt is not None, lte is not None, desc, limit),
+                lambda: self._select_events_queryset(
+                    originator_id, gt, lte, desc, limit
+                ).values_list(*self._select_events_fields),
+                params,
+                using,
+            )
+        return [self._stored_event_from_row(row) for row in rows]
 
 
 class DjangoApplicationRecorder(DjangoAggregateRecorder, ApplicationRecorder):
+    default_lock_mode = LOCK_MODE_ADVISORY
+
+    def __init__(self, *args: Any, max_notification_id_ttl: float = 0.0, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        # The max notification ID is selected at most once every
+        # `max_notification_id_ttl` seconds, if this is not zero.
+        self.max_notification_id_ttl = max_notification_id_ttl
+        self._max_notification_id_cache: Optional[Tuple[float, Optional[int]]] = None
+        self.channel_name = f"{self.model._meta.db_table}_{self.application_name}"
+        self._listeners: Set[Event] = set()
+        self._listeners_lock = Lock()
+
     @errors
     def insert_events(
         self, stored_events: List[StoredEvent], **kwargs: Any
@@ -200,7 +884,35 @@ class DjangoApplicationRecorder(DjangoAggregateRecorder, ApplicationRecorder):
         with self.serialize():
             with transaction.atomic(using=self.using):
                 self._lock_table()
-                return self._insert_events(stored_events, **kwargs)
+                notification_ids = self._insert_events(stored_events, **kwargs)
+                self._extend_event_cache_on_commit(stored_events)
+                if stored_events:
+                    self._notify_channel()
+                    transaction.on_commit(self._notify_listeners, using=self.using)
+                return notification_ids
+
+    def _notify_channel(self) -> None:
+        # PostgreSQL delivers notifications when the transaction commits.
+        connection = get_connection(using=self.using)
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(f"NOTIFY {connection.ops.quote_name(self.channel_name)}")
+
+    def listen(self, event: Event) -> None:
+        """Sets the given event whenever events inserted by this recorder are
+        committed.
+        """
+        with self._listeners_lock:
+            self._listeners.add(event)
+
+    def unlisten(self, event: Event) -> None:
+        with self._listeners_lock:
+            self._listeners.discard(event)
+
+    def _notify_listeners(self) -> None:
+        with self._listeners_lock:
+            for listener in self._listeners:
+                listener.set()
 
     @errors
     def select_notifications(
@@ -212,71 +924,716 @@ class DjangoApplicationRecorder(DjangoAggregateRecorder, ApplicationRecorder):
         *,
         inclusive_of_start: bool = True,
     ) -> List[Notification]:
+        using = self._get_notifications_read_alias(start, inclusive_of_start)
+        if self._uses_prepared_statements(get_connection(using=using)):
+            return self._select_notifications_prepared(
+                start, limit, stop, topics, inclusive_of_start, using
+            )
         with self.serialize():
-            q = self.model.objects.using(alias=self.using).filter(
-                application_name=self.application_name,
+            q = self._select_notifications_queryset(
+                start, stop, topics, inclusive_of_start
             )
-            q = q.order_by("id")
-            if start is not None:
-                if inclusive_of_start:
-                    q = q.filter(id__gte=start)
-                else:
-                    q = q.filter(id__gt=start)
-            if stop is not None:
-                q = q.filter(id__lte=stop)
-            if topics:
-                q = q.filter(topic__in=topics)
-            q = q[0:limit]
+            q = q.using(using)[0:limit]
             records = list(q)
-        return [
-            Notification(
-                id=r.id,
-                originator_id=r.originator_id,
-                originator_version=r.originator_version,
-                topic=r.topic,
-                state=bytes(r.state) if isinstance(r.state, memoryview) else r.state,
+        return [self._notification_from_record(r) for r in records]
+
+    def _select_notifications_prepared(
+        self,
+        start: int | None,
+        limit: int,
+        stop: Optional[int],
+        topics: Sequence[str],
+        inclusive_of_start: bool,
+        using: Optional[str] = None,
+    ) -> List[Notification]:
+        rows = self._fetch_notification_rows(
+            ("id", *self._select_events_fields),
+            start,
+            limit,
+            stop,
+            topics,
+            inclusive_of_start,
+            using,
+        )
+        notifications = []
+        for row in rows:
+            stored_event = self._stored_event_from_row(row[1:])
+            notifications.append(
+                Notification(
+                    id=row[0],
+                    originator_id=stored_event.originator_id,
+                    originator_version=stored_event.originator_version,
+                    topic=stored_event.topic,
+                    state=stored_event.state,
+                )
             )
-            for r in records
-        ]
+        return notifications
+
+    def _fetch_notification_rows(
+        self,
+        fields: Tuple[str, ...],
+        start: int | None,
+        limit: int,
+        stop: Optional[int],
+        topics: Sequence[str],
+        inclusive_of_start: bool,
+        using: Optional[str],
+    ) -> List[Tuple[Any, ...]]:
+        params: List[Any] = [self.application_name]
+        if start is not None:
+            params.append(start)
+        if stop is not None:
+            params.append(stop)
+        topic_hashes = self._topic_hashes(topics)
+        params.extend(topic_hashes)
+        params.extend(dict.fromkeys(topics))
+        shape = (
+            "select_notifications",
+            fields,
+            start is not None,
+            inclusive_of_start,
+            stop is not None,
+            len(topic_hashes),
+            len(params),
+            limit,
+        )
+        return self._fetch_rows(
+            shape,
+            lambda: self._select_notifications_queryset(
+                start, stop, topics, inclusive_of_start
+            ).values_list(*fields)[0:limit],
+            params,
+            using,
+        )
 
     @errors
-    def max_notification_id(self) -> int | None:
-        with self.serialize():
-            q = self.model.objects.using(alias=self.using).filter(
-                application_name=self.application_name,
+    def select_notification_headers(
+        self,
+        start: int | None,
+        limit: int,
+        stop: Optional[int] = None,
+        topics: Sequence[str] = (),
+        *,
+        inclusive_of_start: bool = True,
+    ) -> List[NotificationHeader]:
+        """
+        Returns the IDs, originator IDs, originator versions, and topics of
+        notifications, with the same arguments as `select_notifications()`,
+        without selecting their states.
+        """
+        using = self._get_notifications_read_alias(start, inclusive_of_start)
+        if self._uses_prepared_statements(get_connection(using=using)):
+            rows = self._fetch_notification_rows(
+                NOTIFICATION_HEADER_FIELDS,
+                start,
+                limit,
+                stop,
+                topics,
+                inclusive_of_start,
+                using,
+            )
+        else:
+            with self.serialize():
+                q = self._select_notifications_queryset(
+                    start, stop, topics, inclusive_of_start
+                )
+                q = q.using(using).values_list(*NOTIFICATION_HEADER_FIELDS)
+                rows = list(q[0:limit])
+        return [self._notification_header_from_row(row) for row in rows]
+
+    def _notification_header_from_row(self, row: Tuple[Any, ...]) -> NotificationHeader:
+        return NotificationHeader(
+            id=row[0],
+            originator_id=self.model._meta.get_field("originator_id").to_python(row[1]),
+            originator_version=row[2],
+            topic=row[3],
+        )
+
+    def _get_notifications_read_alias(
+        self, start: int | None, inclusive_of_start: bool
+    ) -> Optional[str]:
+        using = self._get_read_alias()
+        if using != self.read_using or start is None:
+            return using
+        first_id = start if inclusive_of_start else start + 1
+        if first_id <= self._max_replicated_id:
+            return using
+        # Followers that have caught up request notifications that haven't been
+        # recorded yet, so the primary database is only used if it has the first
+        # notification that is requested, and the read database doesn't.
+        max_notification_id = self.max_notification_id() or 0
+        if max_notification_id >= first_id and not self._is_replicated(first_id):
+            return self.using
+        return using
+
+    def iter_notifications(
+        self,
+        start: int | None = None,
+        stop: Optional[int] = None,
+        topics: Sequence[str] = (),
+        *,
+        inclusive_of_start: bool = True,
+        chunk_size: int = 1000,
+    ) -> Iterator[Notification]:
+        """
+        Iterates over notifications with a single query, fetching rows from the
+        database in chunks, so that the whole notification log can be read in
+        constant memory. On PostgreSQL, this uses a server-side cursor.
+        """
+        if self.lock is not None:
+            # The lock on an in-memory SQLite database can't be held between
+            # iterations, so notifications are selected one chunk at a time.
+            iterator = self._iter_notifications_in_pages(
+                start, stop, topics, inclusive_of_start, chunk_size
+            )
+        else:
+            q = self._select_notifications_queryset(
+                start, stop, topics, inclusive_of_start
+            ).using(self._get_notifications_read_alias(start, inclusive_of_start))
+            iterator = map(
+                self._notification_from_record, q.iterator(chunk_size=chunk_size)
             )
-            q = q.order_by("-id")
+        next_notification = errors(next)
+        while True:
             try:
-                max_id = q[0].id
-            except IndexError:
-                max_id = None
-        return max_id
+                notification = next_notification(iterator)
+            except StopIteration:
+                return
+            yield notification
+
+    def _iter_notifications_in_pages(
+        self,
+        start: int | None,
+        stop: Optional[int],
+        topics: Sequence[str],
+        inclusive_of_start: bool,
+        chunk_size: int,
+    ) -> Iterator[Notification]:
+        while True:
+            notifications = self.select_notifications(
+                start,
+                limit=chunk_size,
+                stop=stop,
+                topics=topics,
+                inclusive_of_start=inclusive_of_start,
+            )
+            yield from notifications
+            if len(notifications) < chunk_size:
+                return
+            start = notifications[-1].id
+            inclusive_of_start = False
+
+    def _select_notifications_queryset(
+        self,
+        start: int | None,
+        stop: Optional[int],
+        topics: Sequence[str],
+        inclusive_of_start: bool,
+    ) -> models.QuerySet[Any]:
+        q = self.model.objects.using(alias=self.using).filter(
+            application_name=self.application_name,
+        )
+        q = q.order_by("id")
+        if start is not None:
+            if inclusive_of_start:
+                q = q.filter(id__gte=start)
+            else:
+                q = q.filter(id__gt=start)
+        if stop is not None:
+            q = q.filter(id__lte=stop)
+        if topics:
+            if self.has_topic_hashes:
+                # Use the index on the topic hashes. Also filter by topic,
+                # in case different topics have the same hash. Rows without
+                # a hash (e.g. inserted by older versions) are also matched.
+                q = q.filter(
+                    models.Q(topic_hash__in=self._topic_hashes(topics))
+                    | models.Q(topic_hash__isnull=True)
+                )
+            q = q.filter(topic__in=topics)
+        return q
+
+    def _topic_hashes(self, topics: Sequence[str]) -> List[int]:
+        if not self.has_topic_hashes:
+            return []
+        return list(dict.fromkeys(hash_to_bigint(t) for t in topics))
+
+    @staticmethod
+    def _notification_from_record(r: Any) -> Notification:
+        return Notification(
+            id=r.id,
+            originator_id=r.originator_id,
+            originator_version=r.originator_version,
+            topic=r.topic,
+            state=decode_state(r.state, getattr(r, "codec", None)),
+        )
+
+    @errors
+    def max_notification_id(self) -> int | None:
+        if not self.max_notification_id_ttl or (
+            get_connection(using=self.using).in_atomic_block
+        ):
+            return self._select_max_notification_id()
+        cached = self._max_notification_id_cache
+        now = monotonic()
+        if cached is None or now - cached[0] >= self.max_notification_id_ttl:
+            cached = (now, self._select_max_notification_id())
+            self._max_notification_id_cache = cached
+        # Notifications inserted by the recorder are included without delay.
+        return max(cached[1] or 0, self._max_inserted_id) or None
+
+    def _select_max_notification_id(self) -> int | None:
+        if self._uses_prepared_statements(get_connection(using=self.using)):
+            rows = self._fetch_rows(
+                ("max_notification_id",),
+                lambda: self._max_notification_id_queryset()[:1],
+                [self.application_name],
+            )
+            return rows[0][0] if rows else None
+        with self.serialize():
+            # Only the ID is selected, rather than the whole row with the state.
+            return self._max_notification_id_queryset().first()
+
+    def _max_notification_id_queryset(self) -> models.QuerySet[Any]:
+        q = self.model.objects.using(alias=self.using).filter(
+            application_name=self.application_name,
+        )
+        return q.order_by("-id").values_list("id", flat=True)
 
     def subscribe(
         self, gt: int | None = None, topics: Sequence[str] = ()
     ) -> Subscription[ApplicationRecorder]:
-        raise NotImplementedError
+        return DjangoSubscription(recorder=self, gt=gt, topics=topics)
+
+
+class DjangoSubscription(ListenNotifySubscription[DjangoApplicationRecorder]):
+    """Pulls new notifications from the recorder whenever it is notified.
+
+    On PostgreSQL, the subscription uses a dedicated database connection to LISTEN
+    for notifications sent by the recorders of any process. On other databases, the
+    subscription polls the database every `poll_interval` seconds. In both cases,
+    the subscription is notified immediately when events are inserted by the same
+    recorder object.
+    """
+
+    poll_interval = 1.0
+    listen_interval = 0.1
+
+    def __init__(
+        self,
+        recorder: DjangoApplicationRecorder,
+        gt: int | None = None,
+        topics: Sequence[str] = (),
+    ) -> None:
+        assert isinstance(recorder, DjangoApplicationRecorder)
+        self._is_stopping = Event()
+        super().__init__(recorder=recorder, gt=gt, topics=topics)
+        self._recorder.listen(self._has_been_notified)
+        self._has_been_notified.set()
+        self._listen_thread = Thread(target=self._listen)
+        self._listen_thread.start()
+
+    def __exit__(self, *args: object, **kwargs: Any) -> None:
+        super().__exit__(*args, **kwargs)
+        self._listen_thread.join()
+
+    def stop(self) -> None:
+        super().stop()
+        self._recorder.unlisten(self._has_been_notified)
+        self._is_stopping.set()
+
+    def _loop_on_pull(self) -> None:
+        try:
+            super()._loop_on_pull()
+        finally:
+            # Django opened a connection for this thread.
+            connections[self._recorder.using or DEFAULT_DB_ALIAS].close()
+
+    def _listen(self) -> None:
+        try:
+            connection = connections[self._recorder.using or DEFAULT_DB_ALIAS]
+            if connection.vendor == "postgresql":
+                self._listen_for_notifications(connection)
+            else:
+                while not self._is_stopping.wait(timeout=self.poll_interval):
+                    self._has_been_notified.set()
+        except Exception as e:
+            if self._thread_error is None:
+                self._thread_error = e
+            self.stop()
+
+    def _listen_for_notifications(self, connection: Any) -> None:
+        channel = connection.ops.quote_name(self._recorder.channel_name)
+        conn = connection.get_new_connection(connection.get_connection_params())
+        try:
+            conn.autocommit = True
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {channel}")
+            # Pull again, in case events were committed before listening started.
+            self._has_been_notified.set()
+            while not self._has_been_stopped and not self._thread_error:
+                if self._wait_for_notifications(conn):
+                    self._has_been_notified.set()
+        finally:
+            conn.close()
+
+    def _wait_for_notifications(self, conn: Any) -> bool:
+        if hasattr(conn, "poll"):
+            # Using psycopg2.
+            if select.select([conn], [], [], self.listen_interval)[0]:
+                conn.poll()
+                has_notifications = bool(conn.notifies)
+                conn.notifies.clear()
+                return has_notifications
+            return False
+        # Using psycopg (version 3).
+        for _ in conn.notifies(timeout=self.listen_interval, stop_after=1):
+            return True
+        return False
+
+
+class DjangoTrackingRecorder(DjangoRecorder, TrackingRecorder):
+    """Records the latest position in each upstream notification log,
+    with one row for each upstream application.
+    """
+
+    @errors
+    def insert_tracking(self, tracking: Tracking) -> None:
+        with self.serialize():
+            with transaction.atomic(using=self.using):
+                self._insert_tracking(tracking)
+
+    def _insert_tracking(self, tracking: Tracking) -> None:
+        connection = get_connection(using=self.using)
+        if connection.vendor in ("postgresql", "sqlite") and (
+            connection.features.can_return_columns_from_insert
+        ):
+            # Insert or move forward the position, with a single statement.
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    self._upsert_tracking_statement(connection),
+                    [
+                        self.application_name,
+                        tracking.application_name,
+                        tracking.notification_id,
+                    ],
+                )
+                if cursor.fetchone() is None:
+                    raise IntegrityError(
+                        "Failed to record tracking for "
+                        f"{tracking.application_name} {tracking.notification_id}"
+                    )
+            return
+
+        q = self.model.objects.using(alias=self.using).filter(
+            application_name=self.application_name,
+            upstream_application_name=tracking.application_name,
+        )
+        if not q.filter(notification_id__lt=tracking.notification_id).update(
+            notification_id=tracking.notification_id
+        ):
+            # Either there isn't a row for the upstream application yet, or the
+            # recorded position isn't lower than the given notification ID, in
+            # which case the unique constraint makes the insert fail.
+            record = self.model(
+                application_name=self.application_name,
+                upstream_application_name=tracking.application_name,
+                notification_id=tracking.notification_id,
+            )
+            record.save(using=self.using, force_insert=True)
+
+    def _upsert_tracking_statement(self, connection: Any) -> str:
+        qn = connection.ops.quote_name
+        opts = self.model._meta
+        table = qn(opts.db_table)
+        application_name = qn(opts.get_field("application_name").column)
+        upstream = qn(opts.get_field("upstream_application_name").column)
+        notification_id = qn(opts.get_field("notification_id").column)
+        return (
+            f"INSERT INTO {table} ({application_name}, {upstream}, {notification_id}) "
+            "VALUES (%s, %s, %s) "
+            f"ON CONFLICT ({application_name}, {upstream}) DO UPDATE "
+            f"SET {notification_id} = EXCLUDED.{notification_id} "
+            f"WHERE {table}.{notification_id} < EXCLUDED.{notification_id} "
+            f"RETURNING {notification_id}"
+        )
+
+    @errors
+    def max_tracking_id(self, application_name: str) -> int | None:
+        if self._uses_prepared_statements(get_connection(using=self.using)):
+            rows = self._fetch_rows(
+                ("max_tracking_id",),
+                lambda: self.model.objects.using(alias=self.using)
+                .filter(
+                    application_name=self.application_name,
+                    upstream_application_name=application_name,
+                )
+                .values_list("notification_id")[:1],
+                [self.application_name, application_name],
+            )
+            return rows[0][0] if rows else None
+        with self.serialize():
+            q = self.model.objects.using(alias=self.using).filter(
+                application_name=self.application_name,
+                upstream_application_name=application_name,
+            )
+            max_ids = list(q.values_list("notification_id", flat=True)[:1])
+        return max_ids[0] if max_ids else None
 
 
 class DjangoProcessRecorder(DjangoApplicationRecorder, ProcessRecorder):
+    """Records tracking objects atomically with stored events.
+
+    By default, a row is appended to the `notification_tracking` table for each
+    tracking object. With `single_row_tracking`, only the latest position in each
+    upstream notification log is recorded, in the `tracking_positions` table.
+    """
+
+    def __init__(
+        self, *args: Any, single_row_tracking: bool = False, **kwargs: Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.single_row_tracking = single_row_tracking
+        self.position_recorder = DjangoTrackingRecorder(
+            application_name=self.application_name,
+            model=TrackingPositionRecord,
+            using=self.using,
+            prepared_statements=self.prepared_statements,
+        )
+        self._batches = local()
+
+    @errors
+    def insert_events(
+        self, stored_events: List[StoredEvent], **kwargs: Any
+    ) -> Optional[Sequence[int]]:
+        batch = getattr(self._batches, "buffer", None)
+        if batch is None:
+            return super().insert_events(stored_events, **kwargs)
+        tracking: Optional[Tracking] = kwargs.get("tracking", None)
+        self._check_batch(batch, stored_events, tracking)
+        batch.append((stored_events, tracking))
+        # The notification IDs aren't known until the batch is inserted.
+        return []
+
+    @contextmanager
+    def batch(self) -> Iterator[None]:
+        """
+        Buffers the stored events and tracking objects that are given to
+        insert_events() by the current thread, and inserts them all when the
+        context exits without error, in one transaction, with one multi-row
+        INSERT statement for each table. Buffered events are included when
+        events are selected, and buffered tracking objects are included when
+        the max tracking ID is found. Conflicts with recorded events are only
+        detected when the batch is inserted, when exiting the context.
+
+        Since the notification IDs aren't known until the batch is inserted,
+        insert_events() returns an empty list inside a batch. So the application
+        has no recordings to pass to its notify methods, and a runner isn't
+        prompted to pull the new events; followers find them when they next pull.
+        Aggregates are also put in the application's repository cache (if enabled)
+        before the batch is inserted, and stay there if the batch fails.
+        """
+        if getattr(self._batches, "buffer", None) is not None:
+            # Nested batches are part of the outer batch.
+            yield
+            return
+        batch: List[Tuple[List[StoredEvent], Optional[Tracking]]] = []
+        self._batches.buffer = batch
+        try:
+            yield
+        finally:
+            self._batches.buffer = None
+        if batch:
+            super().insert_events(
+                [e for stored_events, _ in batch for e in stored_events],
+                trackings=[t for _, t in batch if t is not None],
+            )
+
+    def _check_batch(
+        self,
+        batch: List[Tuple[List[StoredEvent], Optional[Tracking]]],
+        stored_events: List[StoredEvent],
+        tracking: Optional[Tracking],
+    ) -> None:
+        # Detect the conflicts that the database would find within the batch.
+        buffered_keys = {
+            (str(e.originator_id), e.originator_version)
+            for buffered_events, _ in batch
+            for e in buffered_events
+        }
+        for stored_event in stored_events:
+            key = (str(stored_event.originator_id), stored_event.originator_version)
+            if key in buffered_keys:
+                raise IntegrityError(f"Event already in batch: {key}")
+            buffered_keys.add(key)
+        if tracking is not None:
+            max_tracking_id = self._max_batch_tracking_id(tracking.application_name)
+            if max_tracking_id is not None and (
+                tracking.notification_id <= max_tracking_id
+            ):
+                raise IntegrityError(
+                    f"Tracking already in batch: {tracking.application_name} "
+                    f"{max_tracking_id} >= {tracking.notification_id}"
+                )
+
+    def _max_batch_tracking_id(self, application_name: str) -> Optional[int]:
+        batch = getattr(self._batches, "buffer", None) or []
+        return max(
+            (
+                t.notification_id
+                for _, t in batch
+                if t is not None and t.application_name == application_name
+            ),
+            default=None,
+        )
+
+    @errors
+    def select_events(
+        self,
+        originator_id: UUID,
+        gt: Optional[int] = None,
+        lte: Optional[int] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+    ) -> List[StoredEvent]:
+        # The buffered events are merged after the event cache is used, so
+        # that events which may never be committed aren't cached.
+        stored_events = super().select_events(originator_id, gt, lte, desc, limit)
+        return self._with_buffered_events(
+            stored_events, originator_id, gt, lte, desc, limit
+        )
+
+    def select_events_many(
+        self,
+        originator_ids: Iterable[UUID],
+        gt: Optional[int] = None,
+        lte: Optional[int] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+    ) -> Dict[UUID, List[StoredEvent]]:
+        stored_events = super().select_events_many(originator_ids, gt, lte, desc, limit)
+        return {
+            originator_id: self._with_buffered_events(
+                events, originator_id, gt, lte, desc, limit
+            )
+            for originator_id, events in stored_events.items()
+        }
+
+    def select_snapshot_and_events(
+        self, originator_id: UUID, lte: Optional[int] = None
+    ) -> Tuple[Optional[StoredEvent], List[StoredEvent]]:
+        snapshot, stored_events = super().select_snapshot_and_events(originator_id, lte)
+        if self.snapshot_model is None:
+            # The buffered events were included when the events were selected.
+            return snapshot, stored_events
+        gt = snapshot.originator_version if snapshot is not None else None
+        return snapshot, self._with_buffered_events(
+            stored_events, originator_id, gt, lte, False, None
+        )
+
+    def _with_buffered_events(
+        self,
+        stored_events: List[StoredEvent],
+        originator_id: UUID,
+        gt: Optional[int],
+        lte: Optional[int],
+        desc: bool,
+        limit: Optional[int],
+    ) -> List[StoredEvent]:
+        batch = getattr(self._batches, "buffer", None)
+        if not batch:
+            return stored_events
+        buffered_events = [
+            e
+            for buffered_events, _ in batch
+            for e in buffered_events
+            if str(e.originator_id) == str(originator_id)
+            and (gt is None or e.originator_version > gt)
+            and (lte is None or e.originator_version <= lte)
+        ]
+        if not buffered_events:
+            return stored_events
+        stored_events = sorted(
+            stored_events + buffered_events,
+            key=lambda e: e.originator_version,
+            reverse=desc,
+        )
+        return stored_events[:limit] if limit is not None else stored_events
+
     def _insert_events(
         self, stored_events: List[StoredEvent], **kwargs: Any
     ) -> Sequence[int]:
         notification_ids = super(DjangoProcessRecorder, self)._insert_events(
             stored_events, **kwargs
         )
+        trackings: List[Tracking] = list(kwargs.get("trackings", ()))
         tracking: Optional[Tracking] = kwargs.get("tracking", None)
         if tracking is not None:
-            record = NotificationTrackingRecord(
+            trackings.append(tracking)
+        self._insert_trackings(trackings)
+        return notification_ids
+
+    def _insert_tracking(self, tracking: Tracking) -> None:
+        self._insert_trackings([tracking])
+
+    def _insert_trackings(self, trackings: List[Tracking]) -> None:
+        if not trackings:
+            return
+        if self.single_row_tracking:
+            # Only the latest position in each upstream notification log is kept.
+            latest: Dict[str, Tracking] = {}
+            for tracking in trackings:
+                if tracking.application_name in latest:
+                    if (
+                        tracking.notification_id <= latest[
+                            tracking.application_name
+                        ].notification_id
+                    ):
+                        raise IntegrityError(
+                            f"Tracking out of order: {tracking.application_name} "
+                            f"{tracking.notification_id}"
+                        )
+                latest[tracking.application_name] = tracking
+            for tracking in latest.values():
+                self.position_recorder._insert_tracking(tracking)
+            return
+        records = [
+            NotificationTrackingRecord(
                 application_name=self.application_name,
                 upstream_application_name=tracking.application_name,
                 notification_id=tracking.notification_id,
             )
-            record.save(using=self.using)
-        return notification_ids
+            for tracking in trackings
+        ]
+        if len(records) == 1:
+            records[0].save(using=self.using)
+        else:
+            NotificationTrackingRecord.objects.using(self.using).bulk_create(records)
 
     @errors
     def max_tracking_id(self, application_name: str) -> int | None:
+        max_id = self._max_batch_tracking_id(application_name)
+        if max_id is not None:
+            return max_id
+        if self.single_row_tracking:
+            max_id = self.position_recorder.max_tracking_id(application_name)
+            if max_id is not None:
+                return max_id
+            # Continue from positions recorded before switching to single-row
+            # tracking, until a position has been recorded in the new table.
+        if self._uses_prepared_statements(get_connection(using=self.using)):
+            rows = self._fetch_rows(
+                ("max_notification_tracking_id",),
+                lambda: NotificationTrackingRecord.objects.using(alias=self.using)
+                .filter(
+                    application_name=self.application_name,
+                    upstream_application_name=application_name,
+                )
+                .order_by("-notification_id")
+                .values_list("notification_id")[:1],
+                [self.application_name, application_name],
+            )
+            return rows[0][0] if rows else None
         with self.serialize():
             q = NotificationTrackingRecord.objects.using(alias=self.using).filter(
                 application_name=self.application_name,
@@ -289,6 +1646,100 @@ class DjangoProcessRecorder(DjangoApplicationRecorder, ProcessRecorder):
                 max_id = None
         return max_id
 
+    @errors
     def insert_tracking(self, tracking: Tracking) -> None:
-        # TODO: Separate out a TrackingRecorder...
-        raise NotImplementedError
+        with self.serialize():
+            with transaction.atomic(using=self.using):
+                self._insert_tracking(tracking)
+
+
+class AsyncDjangoAggregateRecorder(DjangoAggregateRecorder):
+    """
+    Aggregate recorder with coroutine methods, for use in async code such as
+    ASGI views, alongside the synchronous methods of the aggregate recorder.
+
+    Events are selected with Django's async ORM. Since Django's transactions
+    can't be used in async code, events are inserted with one call to the
+    synchronous method in a thread, rather than one call per query.
+    """
+
+    @errors
+    async def ainsert_events(
+        self, stored_events: List[StoredEvent], **kwargs: Any
+    ) -> Optional[Sequence[int]]:
+        return await sync_to_async(self.insert_events)(stored_events, **kwargs)
+
+    @errors
+    async def aselect_events(
+        self,
+        originator_id: UUID,
+        gt: Optional[int] = None,
+        lte: Optional[int] = None,
+        desc: bool = False,
+        limit: Optional[int] = None,
+    ) -> List[StoredEvent]:
+        if (
+            self.lock is not None
+            or self.raw_select_events
+            or self.event_cache
+            or self.read_using is not None
+        ):
+            # The lock, the event cache, and the read database are used by the
+            # synchronous method.
+            return await sync_to_async(self.select_events)(
+                originator_id, gt, lte, desc, limit
+            )
+        q = self._select_events_queryset(originator_id, gt, lte, desc, limit)
+        return [self._stored_event_from_record(r) async for r in q]
+
+
+class AsyncDjangoApplicationRecorder(
+    AsyncDjangoAggregateRecorder, DjangoApplicationRecorder
+):
+    """
+    Application recorder with coroutine methods, for use in async code such as
+    ASGI views, alongside the synchronous methods of the application recorder.
+    """
+
+    @errors
+    async def aselect_notifications(
+        self,
+        start: int | None,
+        limit: int,
+        stop: Optional[int] = None,
+        topics: Sequence[str] = (),
+        *,
+        inclusive_of_start: bool = True,
+    ) -> List[Notification]:
+        if self.lock is not None or self.read_using is not None:
+            return await sync_to_async(self.select_notifications)(
+                start, limit, stop, topics, inclusive_of_start=inclusive_of_start
+            )
+        q = self._select_notifications_queryset(start, stop, topics, inclusive_of_start)
+        return [self._notification_from_record(r) async for r in q[0:limit]]
+
+    @errors
+    async def aselect_notification_headers(
+        self,
+        start: int | None,
+        limit: int,
+        stop: Optional[int] = None,
+        topics: Sequence[str] = (),
+        *,
+        inclusive_of_start: bool = True,
+    ) -> List[NotificationHeader]:
+        if self.lock is not None or self.read_using is not None:
+            return await sync_to_async(self.select_notification_headers)(
+                start, limit, stop, topics, inclusive_of_start=inclusive_of_start
+            )
+        q = self._select_notifications_queryset(start, stop, topics, inclusive_of_start)
+        q = q.values_list(*NOTIFICATION_HEADER_FIELDS)[0:limit]
+        return [self._notification_header_from_row(row) async for row in q]
+
+    @errors
+    async def amax_notification_id(self) -> int | None:
+        if self.lock is not None or self.max_notification_id_ttl:
+            # The lock and the cached max notification ID are used by the
+            # synchronous method.
+            return await sync_to_async(self.max_notification_id)()
+        return await self._max_notification_id_queryset().afirst()
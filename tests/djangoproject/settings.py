@@ -10,6 +10,7 @@ https://docs.djangoproject.com/en/3.2/topics/settings/
 For the full list of settings and their values, see
 https://docs.djangoproject.com/en/3.2/ref/settings/
 """
+
 from __future__ import annotations
 
 import os
@@ -118,6 +119,18 @@ DATABASES = {
         "HOST": os.getenv("POSTGRES_HOST", "127.0.0.1"),
         "PORT": os.getenv("POSTGRES_PORT", "5432"),
     },
+    # A stand-in for a read replica of the "postgres" database.
+    "postgres_replica": {
+        "ENGINE": "django.db.backends.postgresql_psycopg2",
+        "NAME": os.getenv("POSTGRES_DB", "eventsourcing_django"),
+        "TEST": {
+            "MIRROR": "postgres",
+        },
+        "USER": os.getenv("POSTGRES_USER", "eventsourcing"),
+        "PASSWORD": os.getenv("POSTGRES_PASSWORD", "eventsourcing"),
+        "HOST": os.getenv("POSTGRES_HOST", "127.0.0.1"),
+        "PORT": os.getenv("POSTGRES_PORT", "5432"),
+    },
 }
 
 # Password validation
@@ -82,3 +82,16 @@ class InformalEmailProcess(ProcessApplication[UUID]):
             message="Hi {}, your account is ready.".format(domain_event.full_name),
         )
         processing_event.collect_events(notification)
+
+
+class EmailArchive(ProcessApplication[UUID]):
+    def register_transcodings(self, transcoder: JSONTranscoder) -> None:
+        super().register_transcodings(transcoder)
+        transcoder.register(EmailAddressAsStr())
+
+    def policy(
+        self,
+        domain_event: DomainEventProtocol[UUID],
+        processing_event: ProcessingEvent[UUID],
+    ) -> None:
+        """Archived emails are only tracked."""
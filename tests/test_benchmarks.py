@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks for the Django recorders.
+
+The benchmarks are skipped unless the environment variable BENCHMARKS is set,
+for example with "make benchmark". The results are saved as JSON in the file
+named by the environment variable BENCHMARKS_OUTPUT (default "benchmarks.json"),
+so that the results of different versions can be compared.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from time import perf_counter
+from typing import TYPE_CHECKING
+from unittest import skipUnless
+from uuid import UUID, uuid4
+
+import django
+from django.db import connections
+from eventsourcing.persistence import StoredEvent, Tracking
+
+from eventsourcing_django.models import StoredEventRecord
+from eventsourcing_django.recorders import (
+    DjangoApplicationRecorder,
+    DjangoProcessRecorder,
+    detect_sqlite_memory_mode,
+)
+from tests.test_recorders import DjangoTestCase
+
+if TYPE_CHECKING:
+    from typing import Any, Callable, Dict, List, Optional
+
+BENCHMARKS = os.getenv("BENCHMARKS", "")
+BENCHMARKS_OUTPUT = os.getenv("BENCHMARKS_OUTPUT", "benchmarks.json")
+
+# Number of stored events in the "large" tables.
+BENCHMARKS_TABLE_SIZE = int(os.getenv("BENCHMARKS_TABLE_SIZE", "10000"))
+
+# Number of times each operation is timed.
+BENCHMARKS_REPEAT = int(os.getenv("BENCHMARKS_REPEAT", "10"))
+
+
+def save_results(name: str, results: List[Dict[str, Any]]) -> None:
+    try:
+        with open(BENCHMARKS_OUTPUT) as f:
+            report = json.load(f)
+    except FileNotFoundError:
+        report = {"results": {}}
+    report["machine"] = {
+        "python": platform.python_version(),
+        "django": django.__version__,
+        "platform": platform.platform(),
+    }
+    report["results"][name] = {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "benchmarks": results,
+    }
+    with open(BENCHMARKS_OUTPUT, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+
+def new_stored_events(num: int, topic: str = "topic1") -> List[StoredEvent]:
+    originator_id = uuid4()
+    return [
+        StoredEvent(
+            originator_id=originator_id,
+            originator_version=version,
+            topic=topic,
+            state=b"state" * 20,
+        )
+        for version in range(1, num + 1)
+    ]
+
+
+@skipUnless(BENCHMARKS, "Set BENCHMARKS environment variable to run benchmarks")
+class TestBenchmarks(DjangoTestCase):
+    db_alias: Optional[str] = None
+    results: List[Dict[str, Any]]
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.results = []
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        vendor = connections[cls.db_alias or "default"].vendor
+        save_results(f"{cls.__name__} ({vendor})", cls.results)
+        super().tearDownClass()
+
+    def create_recorder(self, **kwargs: Any) -> DjangoProcessRecorder:
+        return DjangoProcessRecorder(
+            application_name="app",
+            model=StoredEventRecord,
+            using=self.db_alias,
+            **kwargs,
+        )
+
+    def measure(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        repeat: int = BENCHMARKS_REPEAT,
+        **params: Any,
+    ) -> None:
+        timings = []
+        for _ in range(repeat):
+            started = perf_counter()
+            func()
+            timings.append(perf_counter() - started)
+        self.results.append(
+            {
+                "name": name,
+                "params": params,
+                "runs": repeat,
+                "min": min(timings),
+                "max": max(timings),
+                "mean": statistics.mean(timings),
+                "median": statistics.median(timings),
+            }
+        )
+
+    def fill_table(
+        self, recorder: DjangoApplicationRecorder, num: int = BENCHMARKS_TABLE_SIZE
+    ) -> None:
+        # Insert events in streams of 100, alternating between two topics.
+        for i in range(num // 100):
+            recorder.insert_events(new_stored_events(100, topic=f"topic{i % 2}"))
+
+    @staticmethod
+    def insert_new_events(recorder: DjangoApplicationRecorder, batch_size: int) -> None:
+        recorder.insert_events(new_stored_events(batch_size))
+
+    def test_insert_events(self) -> None:
+        recorder = self.create_recorder()
+        for batch_size in (1, 10, 100, 1000):
+            self.measure(
+                "insert_events",
+                partial(self.insert_new_events, recorder, batch_size),
+                batch_size=batch_size,
+            )
+
+    def test_select_events(self) -> None:
+        recorder = self.create_recorder()
+        for stream_length in (10, 100, 1000):
+            stored_events = new_stored_events(stream_length)
+            recorder.insert_events(stored_events)
+            originator_id = stored_events[0].originator_id
+            assert isinstance(originator_id, UUID)
+            self.measure(
+                "select_events",
+                partial(recorder.select_events, originator_id),
+                stream_length=stream_length,
+            )
+
+    def test_select_notifications(self) -> None:
+        recorder = self.create_recorder()
+        self.fill_table(recorder)
+        for limit in (10, 100, 1000):
+            for topics in ((), ("topic1",)):
+                self.measure(
+                    "select_notifications",
+                    partial(
+                        recorder.select_notifications,
+                        start=BENCHMARKS_TABLE_SIZE // 2,
+                        limit=limit,
+                        topics=topics,
+                    ),
+                    limit=limit,
+                    topics=list(topics),
+                    table_size=BENCHMARKS_TABLE_SIZE,
+                )
+
+    def test_max_notification_id(self) -> None:
+        recorder = self.create_recorder()
+        self.fill_table(recorder)
+        self.measure(
+            "max_notification_id",
+            recorder.max_notification_id,
+            table_size=BENCHMARKS_TABLE_SIZE,
+        )
+
+    def test_max_tracking_id(self) -> None:
+        for single_row_tracking in (False, True):
+            recorder = self.create_recorder(single_row_tracking=single_row_tracking)
+            for notification_id in range(1, BENCHMARKS_TABLE_SIZE // 10 + 1):
+                recorder.insert_tracking(Tracking("upstream", notification_id))
+            self.measure(
+                "max_tracking_id",
+                partial(recorder.max_tracking_id, "upstream"),
+                single_row_tracking=single_row_tracking,
+                tracking_records=BENCHMARKS_TABLE_SIZE // 10,
+            )
+
+    def test_concurrent_writers(self) -> None:
+        connection = connections[self.db_alias or "default"]
+        if detect_sqlite_memory_mode(connection):
+            self.skipTest("In-memory SQLite databases can't be shared by threads")
+        recorder = self.create_recorder()
+
+        def write(num_batches: int) -> None:
+            try:
+                for _ in range(num_batches):
+                    recorder.insert_events(new_stored_events(10))
+            finally:
+                connections[self.db_alias or "default"].close()
+
+        def write_concurrently(num_writers: int) -> None:
+            with ThreadPoolExecutor(max_workers=num_writers) as executor:
+                futures = [
+                    executor.submit(write, 100 // num_writers)
+                    for _ in range(num_writers)
+                ]
+                for future in futures:
+                    future.result()
+
+        for num_writers in (1, 2, 4, 8):
+            self.measure(
+                "concurrent_writers",
+                partial(write_concurrently, num_writers),
+                repeat=3,
+                writers=num_writers,
+                events=1000,
+            )
+
+
+class TestBenchmarksSQLiteFileDb(TestBenchmarks):
+    db_alias = "sqlite_filedb"
+    databases = {"default", "sqlite_filedb"}
+
+
+class TestBenchmarksPostgres(TestBenchmarks):
+    db_alias = "postgres"
+    databases = {"default", "postgres"}
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from django.core.management import call_command
+from eventsourcing.persistence import Tracking
+
+from eventsourcing_django.models import (
+    NotificationTrackingRecord,
+    StoredEventRecord,
+    TrackingPositionRecord,
+)
+from eventsourcing_django.recorders import DjangoProcessRecorder
+from tests.test_recorders import DjangoTestCase
+
+
+class TestCompactNotificationTrackingCommand(DjangoTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        for application_name in ("follower1", "follower2"):
+            recorder = DjangoProcessRecorder(
+                application_name=application_name, model=StoredEventRecord
+            )
+            for notification_id in range(1, 6):
+                recorder.insert_tracking(Tracking("leader1", notification_id))
+            for notification_id in range(1, 4):
+                recorder.insert_tracking(Tracking("leader2", notification_id))
+
+    def test_compact_all_followers(self) -> None:
+        call_command("compact_notification_tracking", verbosity=0)
+
+        self.assertEqual(
+            sorted(
+                NotificationTrackingRecord.objects.values_list(
+                    "application_name", "upstream_application_name", "notification_id"
+                )
+            ),
+            [
+                ("follower1", "leader1", 5),
+                ("follower1", "leader2", 3),
+                ("follower2", "leader1", 5),
+                ("follower2", "leader2", 3),
+            ],
+        )
+        self.assertEqual(TrackingPositionRecord.objects.count(), 0)
+
+        # The followers continue from the same positions.
+        recorder = DjangoProcessRecorder(
+            application_name="follower1", model=StoredEventRecord
+        )
+        self.assertEqual(recorder.max_tracking_id("leader1"), 5)
+        self.assertEqual(recorder.max_tracking_id("leader2"), 3)
+
+    def test_compact_one_follower(self) -> None:
+        call_command("compact_notification_tracking", "follower2", verbosity=0)
+
+        self.assertEqual(
+            NotificationTrackingRecord.objects.filter(
+                application_name="follower1"
+            ).count(),
+            8,
+        )
+        self.assertEqual(
+            NotificationTrackingRecord.objects.filter(
+                application_name="follower2"
+            ).count(),
+            2,
+        )
+
+    def test_compact_to_positions(self) -> None:
+        recorder = DjangoProcessRecorder(
+            application_name="follower1",
+            model=StoredEventRecord,
+            single_row_tracking=True,
+        )
+        # Follower has moved on since switching to single-row tracking.
+        recorder.insert_tracking(Tracking("leader2", 7))
+
+        call_command("compact_notification_tracking", to_positions=True, verbosity=0)
+
+        self.assertEqual(NotificationTrackingRecord.objects.count(), 0)
+        self.assertEqual(
+            sorted(
+                TrackingPositionRecord.objects.values_list(
+                    "application_name", "upstream_application_name", "notification_id"
+                )
+            ),
+            [
+                ("follower1", "leader1", 5),
+                ("follower1", "leader2", 7),
+                ("follower2", "leader1", 5),
+                ("follower2", "leader2", 3),
+            ],
+        )
+        self.assertEqual(recorder.max_tracking_id("leader1"), 5)
+        self.assertEqual(recorder.max_tracking_id("leader2"), 7)
@@ -8,14 +8,23 @@ from eventsourcing.tests.persistence import InfrastructureFactoryTestCase
 from eventsourcing.utils import Environment
 
 from eventsourcing_django.factory import Factory
+from eventsourcing_django.models import SnapshotRecord
 from eventsourcing_django.recorders import (
+    AsyncDjangoAggregateRecorder,
+    AsyncDjangoApplicationRecorder,
     DjangoAggregateRecorder,
     DjangoApplicationRecorder,
     DjangoProcessRecorder,
+    DjangoRecorder,
+    DjangoTrackingRecorder,
 )
 from tests.test_recorders import DjangoTestCase
 
 
+class MyDjangoTrackingRecorder(DjangoTrackingRecorder):
+    pass
+
+
 class TestFactory(DjangoTestCase, InfrastructureFactoryTestCase[Factory]):
     def setUp(self) -> None:
         self.env = Environment("TestCase")
@@ -31,8 +40,146 @@ class TestFactory(DjangoTestCase, InfrastructureFactoryTestCase[Factory]):
     def expected_application_recorder_class(self) -> Type[DjangoApplicationRecorder]:
         return DjangoApplicationRecorder
 
+    def expected_tracking_recorder_class(self) -> Type[DjangoTrackingRecorder]:
+        return DjangoTrackingRecorder
+
+    def tracking_recorder_subclass(self) -> Type[DjangoTrackingRecorder]:
+        return MyDjangoTrackingRecorder
+
     def expected_process_recorder_class(self) -> Type[DjangoProcessRecorder]:
         return DjangoProcessRecorder
 
+    def test_event_cache_size(self) -> None:
+        recorder = self.factory.application_recorder()
+        assert isinstance(recorder, DjangoApplicationRecorder)
+        self.assertIsNone(recorder.event_cache)
+
+        self.env[Factory.DJANGO_EVENT_CACHE_SIZE] = "100"
+        self.factory = Factory(self.env)
+        recorder = self.factory.application_recorder()
+        assert isinstance(recorder, DjangoApplicationRecorder)
+        assert recorder.event_cache is not None
+        self.assertEqual(recorder.event_cache.maxsize, 100)
+        snapshot_recorder = self.factory.aggregate_recorder("snapshots")
+        assert isinstance(snapshot_recorder, DjangoAggregateRecorder)
+        self.assertIsNone(snapshot_recorder.event_cache)
+
+    def test_snapshot_model(self) -> None:
+        recorder = self.factory.application_recorder()
+        assert isinstance(recorder, DjangoApplicationRecorder)
+        self.assertIs(recorder.snapshot_model, SnapshotRecord)
+        process_recorder = self.factory.process_recorder()
+        assert isinstance(process_recorder, DjangoProcessRecorder)
+        self.assertIs(process_recorder.snapshot_model, SnapshotRecord)
+        snapshot_recorder = self.factory.aggregate_recorder("snapshots")
+        assert isinstance(snapshot_recorder, DjangoAggregateRecorder)
+        self.assertIsNone(snapshot_recorder.snapshot_model)
+
+    def test_state_codec(self) -> None:
+        self.env[Factory.DJANGO_STATE_CODEC] = "zlib"
+        self.factory = Factory(self.env)
+        for any_recorder in (
+            self.factory.aggregate_recorder("snapshots"),
+            self.factory.application_recorder(),
+            self.factory.process_recorder(),
+        ):
+            assert isinstance(any_recorder, DjangoAggregateRecorder)
+            self.assertEqual(any_recorder.codec, "zlib")
+
+    def test_application_tables(self) -> None:
+        recorder = self.factory.application_recorder()
+        assert isinstance(recorder, DjangoApplicationRecorder)
+        self.assertEqual(recorder.model._meta.db_table, "stored_events")
+
+        self.env[Factory.DJANGO_APPLICATION_TABLES] = "eventsourcing_runner_django"
+        self.factory = Factory(self.env)
+        for any_recorder in (
+            self.factory.aggregate_recorder(),
+            self.factory.application_recorder(),
+            self.factory.process_recorder(),
+        ):
+            assert isinstance(any_recorder, DjangoAggregateRecorder)
+            self.assertEqual(
+                any_recorder.model._meta.db_table, "stored_events_testcase"
+            )
+            assert any_recorder.snapshot_model is not None
+            self.assertEqual(
+                any_recorder.snapshot_model._meta.db_table, "snapshots_testcase"
+            )
+        snapshot_recorder = self.factory.aggregate_recorder("snapshots")
+        assert isinstance(snapshot_recorder, DjangoAggregateRecorder)
+        self.assertIs(snapshot_recorder.model, self.factory.record_models()[1])
+
+    def test_db_read_alias(self) -> None:
+        recorder = self.factory.application_recorder()
+        assert isinstance(recorder, DjangoApplicationRecorder)
+        self.assertIsNone(recorder.read_using)
+
+        self.env[Factory.DJANGO_DB_READ_ALIAS] = "replica"
+        self.factory = Factory(self.env)
+        for any_recorder in (
+            self.factory.aggregate_recorder(),
+            self.factory.aggregate_recorder("snapshots"),
+            self.factory.application_recorder(),
+            self.factory.process_recorder(),
+        ):
+            assert isinstance(any_recorder, DjangoAggregateRecorder)
+            self.assertIsNone(any_recorder.using)
+            self.assertEqual(any_recorder.read_using, "replica")
+
+    def test_max_notification_id_ttl(self) -> None:
+        recorder = self.factory.application_recorder()
+        assert isinstance(recorder, DjangoApplicationRecorder)
+        self.assertEqual(recorder.max_notification_id_ttl, 0)
+
+        self.env[Factory.DJANGO_MAX_NOTIFICATION_ID_TTL] = "0.5"
+        self.factory = Factory(self.env)
+        for any_recorder in (
+            self.factory.application_recorder(),
+            self.factory.process_recorder(),
+        ):
+            assert isinstance(any_recorder, DjangoApplicationRecorder)
+            self.assertEqual(any_recorder.max_notification_id_ttl, 0.5)
+
+    def test_single_row_tracking(self) -> None:
+        recorder = self.factory.process_recorder()
+        assert isinstance(recorder, DjangoProcessRecorder)
+        self.assertFalse(recorder.single_row_tracking)
+
+        self.env["DJANGO_SINGLE_ROW_TRACKING"] = "yes"
+        self.factory = Factory(self.env)
+        recorder = self.factory.process_recorder()
+        assert isinstance(recorder, DjangoProcessRecorder)
+        self.assertTrue(recorder.single_row_tracking)
+
+    def test_prepared_statements(self) -> None:
+        recorder = self.factory.application_recorder()
+        assert isinstance(recorder, DjangoApplicationRecorder)
+        self.assertFalse(recorder.prepared_statements)
+
+        self.env[Factory.DJANGO_PREPARED_STATEMENTS] = "yes"
+        self.factory = Factory(self.env)
+        for any_recorder in (
+            self.factory.aggregate_recorder(),
+            self.factory.application_recorder(),
+            self.factory.process_recorder(),
+            self.factory.tracking_recorder(),
+        ):
+            assert isinstance(any_recorder, DjangoRecorder)
+            self.assertTrue(any_recorder.prepared_statements)
+
+    def test_async_recorders(self) -> None:
+        recorder = self.factory.application_recorder()
+        self.assertNotIsInstance(recorder, AsyncDjangoApplicationRecorder)
+
+        self.env[Factory.DJANGO_ASYNC_RECORDERS] = "yes"
+        self.factory = Factory(self.env)
+        recorder = self.factory.application_recorder()
+        self.assertIsInstance(recorder, AsyncDjangoApplicationRecorder)
+        snapshot_recorder = self.factory.aggregate_recorder("snapshots")
+        self.assertIsInstance(snapshot_recorder, AsyncDjangoAggregateRecorder)
+        process_recorder = self.factory.process_recorder()
+        self.assertIsInstance(process_recorder, DjangoProcessRecorder)
+
 
 del InfrastructureFactoryTestCase
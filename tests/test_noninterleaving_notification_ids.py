@@ -6,16 +6,20 @@ from typing import Optional
 from eventsourcing.tests.persistence import NonInterleavingNotificationIDsBaseCase
 
 from eventsourcing_django.models import StoredEventRecord
-from eventsourcing_django.recorders import DjangoApplicationRecorder
+from eventsourcing_django.recorders import LOCK_MODE_TABLE, DjangoApplicationRecorder
 from tests.test_recorders import DjangoTestCase
 
 
 class TestNonInterleaving(DjangoTestCase, NonInterleavingNotificationIDsBaseCase):
     db_alias: Optional[str] = None
+    lock_mode: Optional[str] = None
 
     def create_recorder(self) -> DjangoApplicationRecorder:
         return DjangoApplicationRecorder(
-            application_name="app", model=StoredEventRecord, using=self.db_alias
+            application_name="app",
+            model=StoredEventRecord,
+            using=self.db_alias,
+            lock_mode=self.lock_mode,
         )
 
 
@@ -43,4 +47,8 @@ class TestNonInterleavingPostgres(TestNonInterleaving):
         # )
 
 
+class TestNonInterleavingPostgresWithTableLock(TestNonInterleavingPostgres):
+    lock_mode = LOCK_MODE_TABLE
+
+
 del NonInterleavingNotificationIDsBaseCase
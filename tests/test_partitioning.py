@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from io import StringIO
+from typing import TYPE_CHECKING
+from uuid import uuid4
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections, models
+from django.test.utils import CaptureQueriesContext
+from eventsourcing.persistence import StoredEvent
+
+from eventsourcing_django.partitioning import (
+    create_partition,
+    default_partition_name,
+    is_partitioned,
+    partition_name,
+    table_exists,
+)
+from eventsourcing_django.recorders import (
+    LOCK_MODE_TABLE,
+    DjangoApplicationRecorder,
+)
+from tests.test_recorders import DjangoTestCase
+
+if TYPE_CHECKING:
+    from typing import Any, List
+
+TABLE = "partitioned_stored_events"
+
+
+class PartitionedStoredEventRecord(models.Model):
+    id = models.BigAutoField(primary_key=True)
+    application_name = models.CharField(max_length=32)
+    originator_id = models.UUIDField()
+    originator_version = models.BigIntegerField()
+    topic = models.TextField()
+    state = models.BinaryField()
+    topic_hash = models.BigIntegerField(null=True)
+    codec = models.CharField(max_length=8, null=True)
+
+    class Meta:
+        app_label = "eventsourcing_django"
+        db_table = TABLE
+        # The table is created and dropped by the tests.
+        managed = False
+
+
+class TestPartitionStoredEventsWithPostgres(DjangoTestCase):
+    databases = {"default", "postgres"}
+
+    def setUp(self) -> None:
+        super().setUp()
+        self.connection = connections["postgres"]
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"CREATE TABLE {TABLE} (LIKE stored_events INCLUDING ALL)")
+
+    def tearDown(self) -> None:
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DROP TABLE IF EXISTS {TABLE} CASCADE")
+        super().tearDown()
+
+    def create_recorder(
+        self, application_name: str, **kwargs: Any
+    ) -> DjangoApplicationRecorder:
+        return DjangoApplicationRecorder(
+            application_name=application_name,
+            model=PartitionedStoredEventRecord,
+            using="postgres",
+            **kwargs,
+        )
+
+    def insert_events(
+        self, recorder: DjangoApplicationRecorder, num: int = 2
+    ) -> List[int]:
+        originator_id = uuid4()
+        notification_ids = recorder.insert_events(
+            [
+                StoredEvent(originator_id, version, "topic1", b"state")
+                for version in range(1, num + 1)
+            ]
+        )
+        assert notification_ids is not None
+        return list(notification_ids)
+
+    def call_command(self, *args: str) -> str:
+        stdout = StringIO()
+        call_command(
+            "partition_stored_events",
+            *args,
+            database="postgres",
+            table=TABLE,
+            stdout=stdout,
+        )
+        return stdout.getvalue()
+
+    def test_partition_stored_events(self) -> None:
+        recorder1 = self.create_recorder("app1")
+        self.assertEqual(self.insert_events(recorder1), [1, 2])
+
+        self.assertIn(f"Partitioned {TABLE}", self.call_command())
+        self.assertTrue(is_partitioned(self.connection, TABLE))
+        self.assertIn("already partitioned", self.call_command())
+
+        # Partitions are created for new applications by the command, without
+        # scanning the default partition, and the notification IDs continue from
+        # the same sequence.
+        with CaptureQueriesContext(self.connection) as ctx:
+            output = self.call_command("app2")
+        self.assertIn(f"Created partition {TABLE}_app2 for app2", output)
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertIn("VALIDATE CONSTRAINT", sql)
+        self.assertIn("DROP CONSTRAINT", sql)
+        self.assertIn("already has partition", self.call_command("app2"))
+        recorder2 = self.create_recorder("app2")
+        self.assertEqual(self.insert_events(recorder2), [3, 4])
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {TABLE}_app2")
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+        # Recorders don't create partitions, so the rows of applications without
+        # a partition are inserted in the default partition.
+        recorder3 = self.create_recorder("app3")
+        with CaptureQueriesContext(self.connection) as ctx:
+            self.insert_events(recorder3)
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertNotIn("CREATE", sql)
+        self.assertFalse(table_exists(self.connection, partition_name(TABLE, "app3")))
+
+        # The existing rows of an application stay in the default partition.
+        recorder1 = self.create_recorder("app1")
+        self.assertEqual(self.insert_events(recorder1), [7, 8])
+        self.assertFalse(table_exists(self.connection, partition_name(TABLE, "app1")))
+        notifications = recorder1.select_notifications(start=None, limit=10)
+        self.assertEqual([n.id for n in notifications], [1, 2, 7, 8])
+        self.assertEqual(recorder1.max_notification_id(), 8)
+        self.assertEqual(recorder2.max_notification_id(), 4)
+
+        # The rows can be moved to a new partition.
+        output = self.call_command("app1")
+        self.assertIn(f"Moved 4 rows of app1 to {TABLE}_app1", output)
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {default_partition_name(TABLE)}")
+            self.assertEqual(cursor.fetchone()[0], 2)
+            cursor.execute(f"SELECT COUNT(*) FROM {TABLE}_app1")
+            self.assertEqual(cursor.fetchone()[0], 4)
+        self.assertEqual(self.insert_events(recorder1), [9, 10])
+        notifications = recorder1.select_notifications(start=None, limit=10)
+        self.assertEqual([n.id for n in notifications], [1, 2, 7, 8, 9, 10])
+
+        # Only the partition of the application is locked.
+        recorder1 = self.create_recorder("app1", lock_mode=LOCK_MODE_TABLE)
+        with CaptureQueriesContext(self.connection) as ctx:
+            self.insert_events(recorder1)
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertIn(f'LOCK TABLE "{TABLE}_app1" IN EXCLUSIVE MODE', sql)
+
+    def test_partition_not_created_for_rows_in_default_partition(self) -> None:
+        self.call_command()
+        recorder = self.create_recorder("app1")
+        self.insert_events(recorder)
+
+        # The rows of the application need to be moved instead.
+        self.assertFalse(create_partition(self.connection, TABLE, "app1"))
+        self.assertFalse(table_exists(self.connection, partition_name(TABLE, "app1")))
+        self.assertIn("Moved 2 rows of app1", self.call_command("app1"))
+
+        # The constraints that exclude applications from the default partition
+        # are dropped once the partitions have been created.
+        self.assertTrue(create_partition(self.connection, TABLE, "app2"))
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT conname FROM pg_constraint WHERE conrelid = %s::regclass",
+                [default_partition_name(TABLE)],
+            )
+            names = [row[0] for row in cursor.fetchall()]
+        self.assertFalse([name for name in names if name.startswith("exclude_")])
+
+    def test_partition_names(self) -> None:
+        self.assertEqual(partition_name(TABLE, "app1"), f"{TABLE}_app1")
+        long_name = partition_name(TABLE, "a" * 32)
+        self.assertLessEqual(len(long_name), 63)
+        self.assertNotEqual(long_name, partition_name(TABLE, "a" * 31 + "b"))
+        self.assertNotEqual(
+            partition_name(TABLE, "default"), default_partition_name(TABLE)
+        )
+
+    def test_partition_for_application_named_default(self) -> None:
+        self.call_command()
+        output = self.call_command("default")
+        partition = partition_name(TABLE, "default")
+        self.assertIn(f"Created partition {partition} for default", output)
+        recorder = self.create_recorder("default")
+        self.assertEqual(self.insert_events(recorder), [1, 2])
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {partition}")
+            self.assertEqual(cursor.fetchone()[0], 2)
+            cursor.execute(f"SELECT COUNT(*) FROM {default_partition_name(TABLE)}")
+            self.assertEqual(cursor.fetchone()[0], 0)
+
+    def test_only_postgres_tables_can_be_partitioned(self) -> None:
+        with self.assertRaises(CommandError):
+            call_command("partition_stored_events", verbosity=0)
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+
+from io import StringIO
+from uuid import uuid4
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from eventsourcing.persistence import StoredEvent
+
+from eventsourcing_django.models import (
+    SnapshotRecord,
+    StoredEventRecord,
+    create_application_models,
+)
+from eventsourcing_django.recorders import (
+    DjangoAggregateRecorder,
+    DjangoApplicationRecorder,
+)
+from tests.test_recorders import DjangoTestCase
+
+
+class TestRecompressStatesCommand(DjangoTestCase):
+    def setUp(self) -> None:
+        super().setUp()
+        self.originator_id = uuid4()
+        self.stored_events = [
+            StoredEvent(self.originator_id, version, "topic1", b"state" * 100)
+            for version in range(1, 6)
+        ]
+        for application_name in ("app1", "app2"):
+            DjangoApplicationRecorder(
+                application_name=application_name, model=StoredEventRecord
+            ).insert_events(self.stored_events)
+            DjangoAggregateRecorder(
+                application_name=application_name, model=SnapshotRecord
+            ).insert_events(self.stored_events[-1:])
+
+    def test_recompress_all_tables(self) -> None:
+        stdout = StringIO()
+        call_command("recompress_states", codec="zlib", stdout=stdout)
+        self.assertIn("stored_events: recompressed 10 rows", stdout.getvalue())
+        self.assertIn("snapshots: recompressed 2 rows", stdout.getvalue())
+        self.assertEqual(
+            set(StoredEventRecord.objects.values_list("codec")), {("zlib",)}
+        )
+        self.assertEqual(set(SnapshotRecord.objects.values_list("codec")), {("zlib",)})
+
+        # The compressed states are read transparently.
+        recorder = DjangoApplicationRecorder(
+            application_name="app1", model=StoredEventRecord
+        )
+        self.assertEqual(recorder.select_events(self.originator_id), self.stored_events)
+
+        # Compressed rows are not recompressed with the same codec.
+        stdout = StringIO()
+        call_command("recompress_states", codec="zlib", stdout=stdout)
+        self.assertIn("stored_events: recompressed 0 rows", stdout.getvalue())
+
+        # States can be recompressed with another codec, and decompressed.
+        call_command("recompress_states", codec="lzma", verbosity=0)
+        self.assertEqual(
+            set(StoredEventRecord.objects.values_list("codec")), {("lzma",)}
+        )
+        self.assertEqual(recorder.select_events(self.originator_id), self.stored_events)
+        call_command("recompress_states", codec="none", verbosity=0)
+        self.assertEqual(set(StoredEventRecord.objects.values_list("codec")), {(None,)})
+        record = StoredEventRecord.objects.first()
+        assert record is not None
+        self.assertEqual(bytes(record.state), b"state" * 100)
+
+    def test_recompress_gradually(self) -> None:
+        call_command(
+            "recompress_states",
+            "app2",
+            codec="zlib",
+            table="events",
+            batch_size=2,
+            max_rows=3,
+            verbosity=0,
+        )
+        self.assertEqual(
+            list(
+                StoredEventRecord.objects.order_by("id").values_list(
+                    "application_name", "codec"
+                )
+            ),
+            [("app1", None)] * 5 + [("app2", "zlib")] * 3 + [("app2", None)] * 2,
+        )
+        self.assertEqual(SnapshotRecord.objects.filter(codec="zlib").count(), 0)
+
+        # The next run continues with the remaining rows.
+        call_command(
+            "recompress_states", "app2", codec="zlib", table="events", verbosity=0
+        )
+        self.assertEqual(
+            StoredEventRecord.objects.filter(
+                application_name="app2", codec="zlib"
+            ).count(),
+            5,
+        )
+
+    def test_states_that_would_not_be_smaller_are_not_compressed(self) -> None:
+        DjangoApplicationRecorder(
+            application_name="app3", model=StoredEventRecord
+        ).insert_events([StoredEvent(uuid4(), 1, "topic1", b"x")])
+        call_command("recompress_states", "app3", codec="zlib", verbosity=0)
+        self.assertEqual(
+            StoredEventRecord.objects.get(application_name="app3").codec, None
+        )
+
+    def test_recompress_application_models(self) -> None:
+        stored_event_model, snapshot_model = create_application_models(
+            "eventsourcing_runner_django", "app"
+        )
+        with connection.schema_editor() as schema_editor:
+            schema_editor.create_model(stored_event_model)
+            schema_editor.create_model(snapshot_model)
+        try:
+            DjangoApplicationRecorder(
+                application_name="app", model=stored_event_model
+            ).insert_events(self.stored_events)
+            stdout = StringIO()
+            call_command(
+                "recompress_states",
+                codec="zlib",
+                models=[f"eventsourcing_runner_django.{stored_event_model.__name__}"],
+                stdout=stdout,
+            )
+            self.assertEqual(
+                stdout.getvalue().strip(), "stored_events_app: recompressed 5 rows"
+            )
+            self.assertEqual(
+                set(stored_event_model.objects.values_list("codec")), {("zlib",)}
+            )
+            self.assertEqual(StoredEventRecord.objects.filter(codec="zlib").count(), 0)
+        finally:
+            with connection.schema_editor() as schema_editor:
+                schema_editor.delete_model(stored_event_model)
+                schema_editor.delete_model(snapshot_model)
+
+    def test_invalid_model(self) -> None:
+        with self.assertRaisesRegex(CommandError, "Invalid model"):
+            call_command("recompress_states", codec="zlib", models=["unknown.Model"])
+        with self.assertRaisesRegex(CommandError, "not a stored event or snapshot"):
+            call_command(
+                "recompress_states",
+                codec="zlib",
+                models=["eventsourcing_django.NotificationTrackingRecord"],
+            )
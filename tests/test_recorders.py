@@ -1,22 +1,44 @@
 # -*- coding: utf-8 -*-
 from __future__ import annotations
 
+from importlib import import_module
+from time import sleep
 from typing import TYPE_CHECKING
-from unittest import skip
+from unittest import mock, skip
+from uuid import UUID, uuid4
 
 import django
+from asgiref.sync import sync_to_async
+from django.db import connections, transaction
+from django.db.migrations.loader import MigrationLoader
 from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from eventsourcing.persistence import IntegrityError, StoredEvent, Tracking
 from eventsourcing.tests.persistence import (
     AggregateRecorderTestCase,
     ApplicationRecorderTestCase,
     ProcessRecorderTestCase,
+    TrackingRecorderTestCase,
 )
 
-from eventsourcing_django.models import SnapshotRecord, StoredEventRecord
+from eventsourcing_django.models import (
+    NotificationTrackingRecord,
+    SnapshotRecord,
+    StoredEventRecord,
+    TrackingPositionRecord,
+    create_application_models,
+)
 from eventsourcing_django.recorders import (
+    LOCK_MODE_ADVISORY,
+    LOCK_MODE_NONE,
+    LOCK_MODE_TABLE,
+    AsyncDjangoApplicationRecorder,
     DjangoAggregateRecorder,
     DjangoApplicationRecorder,
     DjangoProcessRecorder,
+    DjangoTrackingRecorder,
+    NotificationHeader,
+    hash_to_bigint,
     journal_modes,
 )
 
@@ -76,6 +98,112 @@ class TestDjangoAggregateRecorder(DjangoTestCase, AggregateRecorderTestCase):
         connection.close()
 
 
+class TestDjangoAggregateRecorderWithRawSelectEvents(TestDjangoAggregateRecorder):
+    def create_recorder(self) -> DjangoAggregateRecorder:
+        return DjangoAggregateRecorder(
+            application_name="app", model=StoredEventRecord, raw_select_events=True
+        )
+
+    def test_select_events_statements_are_reused(self) -> None:
+        recorder = self.create_recorder()
+        originator_id = uuid4()
+        recorder.insert_events(
+            [
+                StoredEvent(
+                    originator_id=originator_id,
+                    originator_version=version,
+                    topic="topic1",
+                    state=b"state%d" % version,
+                )
+                for version in range(1, 4)
+            ]
+        )
+
+        events = recorder.select_events(originator_id, gt=1)
+        self.assertEqual([e.originator_version for e in events], [2, 3])
+        events = recorder.select_events(originator_id, gt=2)
+        self.assertEqual([e.originator_version for e in events], [3])
+        events = recorder.select_events(originator_id, desc=True, limit=1)
+        self.assertEqual(events[0].originator_id, originator_id)
+        self.assertEqual(events[0].originator_version, 3)
+        self.assertEqual(events[0].state, b"state3")
+
+        # One statement for each shape of query.
+        self.assertEqual(len(recorder._statements), 2)
+
+
+class TestDjangoAggregateRecorderWithEventCache(TestDjangoAggregateRecorder):
+    def create_recorder(self) -> DjangoAggregateRecorder:
+        return DjangoAggregateRecorder(
+            application_name="app", model=StoredEventRecord, event_cache_size=2
+        )
+
+    def test_event_cache(self) -> None:
+        recorder = self.create_recorder()
+        event_cache = recorder.event_cache
+        assert event_cache is not None
+        originator_id1 = uuid4()
+        originator_id2 = uuid4()
+        originator_id3 = uuid4()
+        recorder.insert_events(
+            [StoredEvent(originator_id1, v, "topic1", b"state") for v in (1, 2)]
+        )
+
+        # Misses are filled on read.
+        self.assertEqual(len(recorder.select_events(originator_id1)), 2)
+        self.assertEqual((event_cache.hits, event_cache.misses), (0, 1))
+
+        # Hits only select events after the last cached event.
+        with CaptureQueriesContext(connection) as ctx:
+            events = recorder.select_events(originator_id1, gt=1)
+        self.assertEqual([e.originator_version for e in events], [2])
+        self.assertEqual((event_cache.hits, event_cache.misses), (1, 1))
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertIn('"originator_version" > 2', ctx.captured_queries[0]["sql"])
+
+        # Committed inserts extend the cached events.
+        recorder.insert_events([StoredEvent(originator_id1, 3, "topic1", b"state")])
+        entry = event_cache.get(originator_id1, None)
+        assert entry is not None
+        self.assertEqual([e.originator_version for e in entry[1]], [1, 2, 3])
+
+        # Events recorded by other recorders are selected.
+        other_recorder = DjangoAggregateRecorder(
+            application_name="app", model=StoredEventRecord
+        )
+        other_recorder.insert_events(
+            [StoredEvent(originator_id1, 4, "topic1", b"state")]
+        )
+        events = recorder.select_events(originator_id1, lte=4)
+        self.assertEqual([e.originator_version for e in events], [1, 2, 3, 4])
+
+        # Inserts that don't follow on from the cached events discard them.
+        other_recorder.insert_events(
+            [StoredEvent(originator_id1, 5, "topic1", b"state")]
+        )
+        recorder.insert_events([StoredEvent(originator_id1, 6, "topic1", b"state")])
+        self.assertIsNone(event_cache.get(originator_id1, None))
+        self.assertEqual(len(recorder.select_events(originator_id1)), 6)
+
+        # Rolled back inserts don't extend the cached events.
+        with transaction.atomic():
+            recorder.insert_events([StoredEvent(originator_id1, 7, "topic1", b"state")])
+            transaction.set_rollback(True)
+        self.assertEqual(len(recorder.select_events(originator_id1)), 6)
+
+        # Least recently used entries are evicted.
+        recorder.select_events(originator_id2)
+        recorder.select_events(originator_id3)
+        self.assertEqual(event_cache.evictions, 1)
+        self.assertIsNone(event_cache.get(originator_id1, None))
+
+        # Cached events can be invalidated.
+        event_cache.invalidate(originator_id2)
+        self.assertIsNone(event_cache.get(originator_id2, None))
+        event_cache.invalidate()
+        self.assertIsNone(event_cache.get(originator_id3, None))
+
+
 class TestDjangoSnapshotRecorder(DjangoTestCase, AggregateRecorderTestCase):
     def create_recorder(self) -> DjangoAggregateRecorder:
         return DjangoAggregateRecorder(application_name="app", model=SnapshotRecord)
@@ -86,6 +214,7 @@ class TestDjangoSnapshotRecorder(DjangoTestCase, AggregateRecorderTestCase):
 
 class TestDjangoApplicationRecorder(DjangoTestCase, ApplicationRecorderTestCase):
     db_alias: Optional[str] = None
+    read_alias: Optional[str] = None
 
     def create_recorder(self) -> DjangoApplicationRecorder:
         return DjangoApplicationRecorder(
@@ -95,6 +224,344 @@ class TestDjangoApplicationRecorder(DjangoTestCase, ApplicationRecorderTestCase)
     def close_db_connection(self, *args: Any) -> None:
         connection.close()
 
+    def capture_select_queries(
+        self, recorder: DjangoApplicationRecorder
+    ) -> CaptureQueriesContext:
+        # Find the events that have been replicated to the read database first.
+        recorder._get_read_alias()
+        alias = self.read_alias or self.db_alias or "default"
+        return CaptureQueriesContext(connections[alias])
+
+    def test_insert_events_in_bulk(self) -> None:
+        recorder = self.create_recorder()
+        originator_id = uuid4()
+        stored_events = [
+            StoredEvent(
+                originator_id=originator_id,
+                originator_version=version,
+                topic="topic1",
+                state=b"state%d" % version,
+            )
+            for version in range(1, 201)
+        ]
+
+        with CaptureQueriesContext(connections[self.db_alias or "default"]) as ctx:
+            notification_ids = recorder.insert_events(stored_events)
+
+        # The events are not inserted one row at a time.
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertLess(len(inserts), 10)
+
+        # The notification IDs are still returned, in order.
+        self.assertEqual(notification_ids, list(range(1, 201)))
+        notifications = recorder.select_notifications(start=None, limit=200)
+        self.assertEqual([n.id for n in notifications], notification_ids)
+        self.assertEqual(notifications[-1].state, b"state200")
+
+    def test_select_notifications_by_topic_hash(self) -> None:
+        recorder = self.create_recorder()
+        originator_id = uuid4()
+        recorder.insert_events(
+            [
+                StoredEvent(originator_id, 1, "topic1", b"state1"),
+                StoredEvent(originator_id, 2, "topic2", b"state2"),
+                StoredEvent(originator_id, 3, "topic1", b"state3"),
+            ]
+        )
+        records = recorder.model.objects.using(self.db_alias).order_by("id")
+        self.assertEqual(
+            list(records.values_list("topic_hash", flat=True)),
+            [
+                hash_to_bigint("topic1"),
+                hash_to_bigint("topic2"),
+                hash_to_bigint("topic1"),
+            ],
+        )
+
+        with self.capture_select_queries(recorder) as ctx:
+            notifications = recorder.select_notifications(
+                start=None, limit=10, topics=["topic1"]
+            )
+        self.assertEqual([n.id for n in notifications], [1, 3])
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertIn("topic_hash", sql)
+
+        # Rows are also matched on the topic, in case the hashes collide.
+        records.filter(id=2).update(topic_hash=hash_to_bigint("topic1"))
+        notifications = recorder.select_notifications(
+            start=None, limit=10, topics=["topic1"]
+        )
+        self.assertEqual([n.id for n in notifications], [1, 3])
+
+        # Rows without a hash (e.g. inserted by older versions) are also selected.
+        records.filter(id=3).update(topic_hash=None)
+        notifications = recorder.select_notifications(
+            start=None, limit=10, topics=["topic1"]
+        )
+        self.assertEqual([n.id for n in notifications], [1, 3])
+
+    def test_select_events_many(self) -> None:
+        recorder = self.create_recorder()
+        recorder.select_events_many_chunk_size = 2
+        originator_ids = [uuid4() for _ in range(3)]
+        stored_events = {
+            originator_id: [
+                StoredEvent(originator_id, version, "topic1", b"state%d" % version)
+                for version in range(1, 4)
+            ]
+            for originator_id in originator_ids
+        }
+        for events in stored_events.values():
+            recorder.insert_events(events)
+        missing_id = uuid4()
+
+        # The events are selected with one query for each chunk of originator IDs.
+        with self.capture_select_queries(recorder) as ctx:
+            selected = recorder.select_events_many(originator_ids + [missing_id])
+        self.assertEqual(len(ctx.captured_queries), 2)
+        self.assertEqual(selected, {**stored_events, missing_id: []})
+
+        # The arguments apply to the events of each aggregate.
+        selected = recorder.select_events_many(originator_ids, gt=1, lte=2)
+        self.assertEqual(
+            selected, {i: events[1:2] for i, events in stored_events.items()}
+        )
+        selected = recorder.select_events_many(originator_ids, desc=True, limit=2)
+        self.assertEqual(
+            selected, {i: events[:0:-1] for i, events in stored_events.items()}
+        )
+
+        # The latest snapshots of many aggregates are selected in the same way.
+        snapshot_recorder = DjangoAggregateRecorder(
+            application_name="app", model=SnapshotRecord, using=self.db_alias
+        )
+        for events in stored_events.values():
+            snapshot_recorder.insert_events(events[:2])
+        selected = snapshot_recorder.select_events_many(
+            originator_ids, desc=True, limit=1
+        )
+        self.assertEqual(
+            selected, {i: events[1:2] for i, events in stored_events.items()}
+        )
+
+    def test_select_snapshot_and_events(self) -> None:
+        recorder = self.create_recorder()
+        recorder.snapshot_model = SnapshotRecord
+        snapshot_recorder = DjangoAggregateRecorder(
+            application_name="app", model=SnapshotRecord, using=self.db_alias
+        )
+        originator_id = uuid4()
+
+        # Without a snapshot, all the events are selected.
+        self.assertEqual(recorder.select_snapshot_and_events(originator_id), (None, []))
+        stored_events = [
+            StoredEvent(originator_id, version, "topic1", b"state%d" % version)
+            for version in range(1, 6)
+        ]
+        recorder.insert_events(stored_events)
+        self.assertEqual(
+            recorder.select_snapshot_and_events(originator_id), (None, stored_events)
+        )
+
+        # The latest snapshot and the later events are selected.
+        snapshots = [
+            StoredEvent(originator_id, version, "snapshot", b"snapshot%d" % version)
+            for version in (2, 4)
+        ]
+        snapshot_recorder.insert_events(snapshots)
+        with self.capture_select_queries(recorder) as ctx:
+            snapshot, events = recorder.select_snapshot_and_events(originator_id)
+        self.assertEqual(len(ctx.captured_queries), 1)
+        self.assertEqual(snapshot, snapshots[1])
+        self.assertEqual(events, stored_events[4:])
+
+        # Snapshots and events can be selected up to a version.
+        snapshot, events = recorder.select_snapshot_and_events(originator_id, lte=3)
+        self.assertEqual(snapshot, snapshots[0])
+        self.assertEqual(events, stored_events[2:3])
+        snapshot, events = recorder.select_snapshot_and_events(originator_id, lte=1)
+        self.assertIsNone(snapshot)
+        self.assertEqual(events, stored_events[:1])
+
+        # Other aggregates are not selected.
+        self.assertEqual(recorder.select_snapshot_and_events(uuid4()), (None, []))
+
+        # Without a snapshot model, only the events are selected.
+        recorder.snapshot_model = None
+        self.assertEqual(
+            recorder.select_snapshot_and_events(originator_id), (None, stored_events)
+        )
+
+    def test_max_notification_id(self) -> None:
+        recorder = self.create_recorder()
+        other_recorder = self.create_recorder()
+        originator_id = uuid4()
+        recorder.insert_events([StoredEvent(originator_id, 1, "topic1", b"state1")])
+
+        # Only the ID is selected.
+        connection = connections[self.db_alias or "default"]
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(recorder.max_notification_id(), 1)
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertIn("id", sql)
+        self.assertNotIn("state", sql)
+
+        # The max notification ID is selected at most once within the TTL.
+        recorder.max_notification_id_ttl = 60
+        self.assertEqual(recorder.max_notification_id(), 1)
+        other_recorder.insert_events([StoredEvent(originator_id, 2, "topic1", b"x")])
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(recorder.max_notification_id(), 1)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        # Notifications inserted by the recorder are included without delay.
+        recorder.insert_events([StoredEvent(originator_id, 3, "topic1", b"state3")])
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(recorder.max_notification_id(), 3)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        # The max notification ID is selected again when the TTL has expired.
+        recorder.max_notification_id_ttl = 0.001
+        sleep(0.002)
+        self.assertEqual(recorder.max_notification_id(), 3)
+        other_recorder.insert_events(
+            [StoredEvent(originator_id, 4, "topic1", b"state4")]
+        )
+        sleep(0.002)
+        self.assertEqual(recorder.max_notification_id(), 4)
+
+    def test_select_notification_headers(self) -> None:
+        recorder = self.create_recorder()
+        originator_id = uuid4()
+        recorder.insert_events(
+            [
+                StoredEvent(originator_id, 1, "topic1", b"state1"),
+                StoredEvent(originator_id, 2, "topic2", b"state2"),
+                StoredEvent(originator_id, 3, "topic1", b"state3"),
+            ]
+        )
+
+        # The states are not selected.
+        with self.capture_select_queries(recorder) as ctx:
+            headers = recorder.select_notification_headers(start=None, limit=10)
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertIn("topic", sql)
+        self.assertNotIn("state", sql)
+        self.assertEqual(
+            headers,
+            [
+                NotificationHeader(1, originator_id, 1, "topic1"),
+                NotificationHeader(2, originator_id, 2, "topic2"),
+                NotificationHeader(3, originator_id, 3, "topic1"),
+            ],
+        )
+        self.assertIsInstance(headers[0].originator_id, UUID)
+
+        # The arguments are the same as for select_notifications().
+        for kwargs in (
+            dict(start=2, limit=10),
+            dict(start=1, limit=1, inclusive_of_start=False),
+            dict(start=None, limit=10, stop=2),
+            dict(start=None, limit=10, topics=["topic1"]),
+        ):
+            self.assertEqual(
+                [
+                    (h.id, h.topic)
+                    for h in recorder.select_notification_headers(**kwargs)
+                ],
+                [(n.id, n.topic) for n in recorder.select_notifications(**kwargs)],
+            )
+
+    def test_iter_notifications(self) -> None:
+        recorder = self.create_recorder()
+        originator_id = uuid4()
+        recorder.insert_events(
+            [
+                StoredEvent(originator_id, version, f"topic{version % 2}", b"state")
+                for version in range(1, 26)
+            ]
+        )
+
+        with self.capture_select_queries(recorder) as ctx:
+            notifications = list(recorder.iter_notifications(chunk_size=10))
+        self.assertEqual([n.id for n in notifications], list(range(1, 26)))
+        self.assertEqual(notifications[0].state, b"state")
+        if recorder.lock is None:
+            # The notifications are selected with one query.
+            self.assertEqual(len(ctx.captured_queries), 1)
+
+        notification_ids = [
+            n.id
+            for n in recorder.iter_notifications(
+                start=5, stop=20, topics=["topic0"], chunk_size=3
+            )
+        ]
+        self.assertEqual(notification_ids, list(range(6, 21, 2)))
+        notification_ids = [
+            n.id
+            for n in recorder.iter_notifications(
+                start=5, inclusive_of_start=False, chunk_size=5
+            )
+        ]
+        self.assertEqual(notification_ids, list(range(6, 26)))
+
+    def test_insert_subscribe(self) -> None:
+        self.optional_test_insert_subscribe()
+
+    def test_lock_modes(self) -> None:
+        recorder = self.create_recorder()
+        self.assertEqual(recorder.lock_mode, LOCK_MODE_ADVISORY)
+
+        stored_event = StoredEvent(
+            originator_id=uuid4(),
+            originator_version=1,
+            topic="topic1",
+            state=b"state1",
+        )
+        alias = self.db_alias or "default"
+        with CaptureQueriesContext(connections[alias]) as ctx:
+            recorder.insert_events([stored_event])
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        self.assertNotIn("LOCK TABLE", sql)
+        if connections[alias].vendor == "postgresql":
+            self.assertIn("pg_advisory_xact_lock", sql)
+        else:
+            self.assertNotIn("pg_advisory_xact_lock", sql)
+
+        # Snapshots and aggregate sequences aren't locked by default.
+        snapshot_recorder = DjangoAggregateRecorder(
+            application_name="app", model=SnapshotRecord, using=self.db_alias
+        )
+        self.assertEqual(snapshot_recorder.lock_mode, LOCK_MODE_NONE)
+
+        # Different applications use different advisory locks.
+        other_recorder = DjangoApplicationRecorder(
+            application_name="other", model=StoredEventRecord, using=self.db_alias
+        )
+        self.assertNotEqual(
+            recorder.advisory_lock_key, other_recorder.advisory_lock_key
+        )
+
+        # The whole table can still be locked.
+        table_lock_recorder = DjangoApplicationRecorder(
+            application_name="app",
+            model=StoredEventRecord,
+            using=self.db_alias,
+            lock_mode=LOCK_MODE_TABLE,
+        )
+        with CaptureQueriesContext(connections[alias]) as ctx:
+            table_lock_recorder.insert_events(
+                [StoredEvent(uuid4(), 1, "topic1", b"state1")]
+            )
+        sql = " ".join(q["sql"] for q in ctx.captured_queries)
+        if connections[alias].vendor == "postgresql":
+            self.assertIn('LOCK TABLE "stored_events" IN EXCLUSIVE MODE', sql)
+
+        with self.assertRaises(ValueError):
+            DjangoApplicationRecorder(
+                application_name="app", model=StoredEventRecord, lock_mode="row"
+            )
+
 
 class TestDjangoApplicationRecorderWithSQLiteInMemory(TestDjangoApplicationRecorder):
     # db_alias = "default"
@@ -131,6 +598,454 @@ class TestDjangoApplicationRecorderWithPostgres(TestDjangoApplicationRecorder):
     #     )
 
 
+class TestDjangoApplicationRecorderWithPreparedStatements(
+    TestDjangoApplicationRecorderWithPostgres
+):
+    def create_recorder(self) -> DjangoApplicationRecorder:
+        return DjangoApplicationRecorder(
+            application_name="app",
+            model=StoredEventRecord,
+            using=self.db_alias,
+            prepared_statements=True,
+        )
+
+    def test_statements_are_prepared_once(self) -> None:
+        recorder = self.create_recorder()
+        originator_id = uuid4()
+        recorder.insert_events(
+            [
+                StoredEvent(
+                    originator_id=originator_id,
+                    originator_version=version,
+                    topic=f"topic{version % 2}",
+                    state=b"state%d" % version,
+                )
+                for version in range(1, 4)
+            ]
+        )
+        connection = connections[self.db_alias]
+        with CaptureQueriesContext(connection) as ctx:
+            for _ in range(2):
+                events = recorder.select_events(originator_id, gt=1)
+                self.assertEqual([e.originator_version for e in events], [2, 3])
+                self.assertEqual(events[0].originator_id, originator_id)
+                notifications = recorder.select_notifications(
+                    start=1, limit=10, topics=["topic1"]
+                )
+                self.assertEqual([n.id for n in notifications], [1, 3])
+                self.assertEqual(notifications[1].state, b"state3")
+                self.assertEqual(recorder.max_notification_id(), 3)
+
+        sql = [q["sql"] for q in ctx.captured_queries]
+        self.assertEqual(len([q for q in sql if q.startswith("PREPARE")]), 3)
+        self.assertEqual(len([q for q in sql if q.startswith("EXECUTE")]), 6)
+
+        # Positions are also found with prepared statements.
+        process_recorder = DjangoProcessRecorder(
+            application_name="app",
+            model=StoredEventRecord,
+            using=self.db_alias,
+            prepared_statements=True,
+        )
+        self.assertIsNone(process_recorder.max_tracking_id("upstream"))
+        process_recorder.insert_tracking(Tracking("upstream", 1))
+        self.assertEqual(process_recorder.max_tracking_id("upstream"), 1)
+        tracking_recorder = DjangoTrackingRecorder(
+            application_name="app",
+            model=TrackingPositionRecord,
+            using=self.db_alias,
+            prepared_statements=True,
+        )
+        self.assertIsNone(tracking_recorder.max_tracking_id("upstream"))
+        tracking_recorder.insert_tracking(Tracking("upstream", 2))
+        self.assertEqual(tracking_recorder.max_tracking_id("upstream"), 2)
+
+
+class TestDjangoApplicationRecorderWithCompression(TestDjangoApplicationRecorder):
+    def create_recorder(self) -> DjangoApplicationRecorder:
+        return DjangoApplicationRecorder(
+            application_name="app",
+            model=StoredEventRecord,
+            using=self.db_alias,
+            codec="zlib",
+        )
+
+    def test_compressed_and_uncompressed_states(self) -> None:
+        recorder = self.create_recorder()
+        uncompressed_recorder = DjangoApplicationRecorder(
+            application_name="app", model=StoredEventRecord, using=self.db_alias
+        )
+        originator_id = uuid4()
+        stored_events = [
+            StoredEvent(originator_id, 1, "topic1", b"state" * 100),
+            StoredEvent(originator_id, 2, "topic1", b"x"),
+        ]
+        recorder.insert_events(stored_events)
+        uncompressed_recorder.insert_events(
+            [StoredEvent(originator_id, 3, "topic1", b"state" * 100)]
+        )
+        stored_events.append(uncompressed_recorder.select_events(originator_id)[-1])
+
+        # States are only compressed if that makes them smaller.
+        records = StoredEventRecord.objects.using(self.db_alias).order_by("id")
+        self.assertEqual(
+            [(r.codec, len(r.state) < 500) for r in records],
+            [("zlib", True), (None, True), (None, False)],
+        )
+
+        # Compressed and uncompressed states are read by both recorders.
+        for r in (recorder, uncompressed_recorder):
+            self.assertEqual(r.select_events(originator_id), stored_events)
+            self.assertEqual(
+                [n.state for n in r.select_notifications(start=None, limit=10)],
+                [e.state for e in stored_events],
+            )
+            self.assertEqual(
+                r.select_events_many([originator_id]), {originator_id: stored_events}
+            )
+
+        # Compressed snapshots are selected with the events.
+        snapshot = StoredEvent(originator_id, 2, "snapshot", b"snapshot" * 100)
+        DjangoAggregateRecorder(
+            application_name="app",
+            model=SnapshotRecord,
+            using=self.db_alias,
+            codec="lzma",
+        ).insert_events([snapshot])
+        recorder.snapshot_model = SnapshotRecord
+        self.assertEqual(
+            recorder.select_snapshot_and_events(originator_id),
+            (snapshot, stored_events[2:]),
+        )
+
+        with self.assertRaises(ValueError):
+            DjangoApplicationRecorder(
+                application_name="app", model=StoredEventRecord, codec="unknown"
+            )
+
+
+class TestDjangoApplicationRecorderWithCompressionWithPostgres(
+    TestDjangoApplicationRecorderWithCompression
+):
+    db_alias = "postgres"
+    databases = {"postgres"}
+
+
+class TestDjangoApplicationRecorderWithApplicationTables(TestDjangoApplicationRecorder):
+    @classmethod
+    def setUpClass(cls) -> None:
+        super().setUpClass()
+        cls.models = create_application_models("eventsourcing_runner_django", "app")
+        with connections[cls.db_alias or "default"].schema_editor() as schema_editor:
+            for model in cls.models:
+                schema_editor.create_model(model)
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        with connections[cls.db_alias or "default"].schema_editor() as schema_editor:
+            for model in cls.models:
+                schema_editor.delete_model(model)
+        super().tearDownClass()
+
+    def create_recorder(self) -> DjangoApplicationRecorder:
+        return DjangoApplicationRecorder(
+            application_name="app",
+            model=self.models[0],
+            using=self.db_alias,
+            snapshot_model=self.models[1],
+        )
+
+    def test_application_tables(self) -> None:
+        stored_event_model, snapshot_model = self.models
+        self.assertEqual(stored_event_model._meta.db_table, "stored_events_app")
+        self.assertEqual(snapshot_model._meta.db_table, "snapshots_app")
+        self.assertEqual(
+            create_application_models("eventsourcing_runner_django", "app"),
+            self.models,
+        )
+
+        recorder = self.create_recorder()
+        originator_id = uuid4()
+        recorder.insert_events([StoredEvent(originator_id, 1, "topic1", b"state1")])
+        DjangoAggregateRecorder(
+            application_name="app", model=snapshot_model, using=self.db_alias
+        ).insert_events([StoredEvent(originator_id, 1, "snapshot", b"state1")])
+
+        self.assertEqual(stored_event_model.objects.using(self.db_alias).count(), 1)
+        self.assertEqual(snapshot_model.objects.using(self.db_alias).count(), 1)
+        self.assertFalse(StoredEventRecord.objects.using(self.db_alias).exists())
+        self.assertFalse(SnapshotRecord.objects.using(self.db_alias).exists())
+        snapshot, events = recorder.select_snapshot_and_events(originator_id)
+        assert snapshot is not None
+        self.assertEqual(snapshot.topic, "snapshot")
+        self.assertEqual(events, [])
+
+
+class TestDjangoApplicationRecorderWithApplicationTablesWithPostgres(
+    TestDjangoApplicationRecorderWithApplicationTables
+):
+    db_alias = "postgres"
+    databases = {"postgres"}
+
+
+class TestDjangoApplicationRecorderWithReadReplicaWithPostgres(
+    TestDjangoApplicationRecorder
+):
+    db_alias = "postgres"
+    read_alias = "postgres_replica"
+    databases = {"postgres", "postgres_replica"}
+
+    def create_recorder(self) -> DjangoApplicationRecorder:
+        return DjangoApplicationRecorder(
+            application_name="app",
+            model=StoredEventRecord,
+            using=self.db_alias,
+            snapshot_model=SnapshotRecord,
+            read_using=self.read_alias,
+        )
+
+    def test_read_replica(self) -> None:
+        recorder = self.create_recorder()
+        originator_id = uuid4()
+        stored_events = [
+            StoredEvent(originator_id, 1, "topic1", b"state1"),
+            StoredEvent(originator_id, 2, "topic2", b"state2"),
+        ]
+        notification_ids = recorder.insert_events(stored_events)
+        assert notification_ids is not None
+
+        def select_all() -> None:
+            self.assertEqual(recorder.select_events(originator_id), stored_events)
+            self.assertEqual(
+                recorder.select_events_many([originator_id]),
+                {originator_id: stored_events},
+            )
+            self.assertEqual(
+                recorder.select_snapshot_and_events(originator_id),
+                (None, stored_events),
+            )
+            self.assertEqual(
+                [n.id for n in recorder.select_notifications(start=None, limit=10)],
+                notification_ids,
+            )
+
+        def count_queries(alias: str) -> CaptureQueriesContext:
+            return CaptureQueriesContext(connections[alias])
+
+        # Events are selected from the replica, once it has the inserted events.
+        with count_queries(self.db_alias) as primary, count_queries(
+            self.read_alias
+        ) as replica:
+            select_all()
+        self.assertEqual(len(primary), 0)
+        self.assertEqual(len(replica), 5)
+        self.assertEqual(recorder._max_replicated_id, notification_ids[-1])
+
+        # Events are selected from the primary until the replica has the events
+        # inserted by the recorder.
+        recorder._max_inserted_id = notification_ids[-1] + 1
+        with count_queries(self.db_alias) as primary, count_queries(
+            self.read_alias
+        ) as replica:
+            select_all()
+        self.assertEqual(len(primary), 4)
+        self.assertEqual(len(replica), 4)
+        recorder._max_inserted_id = notification_ids[-1]
+
+        # Notifications that haven't been recorded yet, which are requested by
+        # followers that have caught up, are selected from the replica, after
+        # finding the max notification ID of the primary.
+        with count_queries(self.db_alias) as primary, count_queries(
+            self.read_alias
+        ) as replica:
+            recorder.select_notifications(
+                start=notification_ids[-1], limit=10, inclusive_of_start=False
+            )
+        self.assertEqual(len(primary), 1)
+        self.assertEqual(len(replica), 1)
+        with count_queries(self.db_alias) as primary:
+            recorder.select_notifications(start=notification_ids[-1], limit=10)
+        self.assertEqual(len(primary), 0)
+
+        # But notifications are selected from the primary if the primary has the
+        # first notification that is requested, and the replica doesn't (here, the
+        # last notification was inserted by another process, and isn't replicated).
+        recorder._max_inserted_id = recorder._max_replicated_id = notification_ids[0]
+        with mock.patch.object(
+            recorder, "_is_replicated", side_effect=lambda i: i <= notification_ids[0]
+        ):
+            with count_queries(self.db_alias) as primary, count_queries(
+                self.read_alias
+            ) as replica:
+                recorder.select_notifications(start=notification_ids[-1], limit=10)
+        self.assertEqual(len(primary), 2)
+        self.assertEqual(len(replica), 0)
+        recorder._max_inserted_id = notification_ids[-1]
+
+        # Events recorded by other processes may not have been replicated yet, so
+        # events up to a requested version are selected again from the primary if
+        # the replica doesn't have them. Otherwise, the replica's events are used.
+        def lagging_replica(select: Any) -> Any:
+            def wrapper(*args: Any) -> Any:
+                result = select(*args)
+                if args[-1] != self.read_alias:
+                    return result
+                if isinstance(result, tuple):
+                    return result[0], result[1][:-1]
+                return result[:-1]
+
+            return wrapper
+
+        with mock.patch.object(
+            recorder,
+            "_select_events",
+            side_effect=lagging_replica(recorder._select_events),
+        ), mock.patch.object(
+            recorder,
+            "_select_snapshot_and_events",
+            side_effect=lagging_replica(recorder._select_snapshot_and_events),
+        ):
+            self.assertEqual(
+                recorder.select_events(originator_id, lte=2), stored_events
+            )
+            self.assertEqual(
+                recorder.select_events(originator_id, desc=True, lte=2, limit=1),
+                stored_events[1:],
+            )
+            self.assertEqual(
+                recorder.select_snapshot_and_events(originator_id, lte=2),
+                (None, stored_events),
+            )
+            self.assertEqual(recorder.select_events(originator_id), stored_events[:1])
+
+        # Events selected in a transaction are selected from the primary.
+        with transaction.atomic(using=self.db_alias):
+            with count_queries(self.read_alias) as replica:
+                self.assertEqual(recorder.select_events(originator_id), stored_events)
+        self.assertEqual(len(replica), 0)
+
+        # Snapshots are always selected from the replica.
+        snapshot_recorder = DjangoAggregateRecorder(
+            application_name="app",
+            model=SnapshotRecord,
+            using=self.db_alias,
+            read_using=self.read_alias,
+        )
+        snapshot_recorder.insert_events([stored_events[1]])
+        with count_queries(self.read_alias) as replica:
+            self.assertEqual(
+                snapshot_recorder.select_events(originator_id), stored_events[1:]
+            )
+        self.assertEqual(len(replica), 1)
+
+        # Statements are compiled for each database.
+        recorder = DjangoApplicationRecorder(
+            application_name="app",
+            model=StoredEventRecord,
+            using=self.db_alias,
+            read_using=self.read_alias,
+            raw_select_events=True,
+        )
+        recorder._max_inserted_id = notification_ids[-1]
+        self.assertEqual(recorder.select_events(originator_id), stored_events)
+        with transaction.atomic(using=self.db_alias):
+            self.assertEqual(recorder.select_events(originator_id), stored_events)
+        self.assertEqual(
+            sorted(alias for alias, _ in recorder._statements),
+            [self.db_alias, self.read_alias],
+        )
+
+
+class TestAsyncDjangoApplicationRecorder(DjangoTestCase):
+    db_alias: Optional[str] = None
+
+    def create_recorder(self) -> AsyncDjangoApplicationRecorder:
+        return AsyncDjangoApplicationRecorder(
+            application_name="app", model=StoredEventRecord, using=self.db_alias
+        )
+
+    async def test_insert_and_select(self) -> None:
+        recorder = self.create_recorder()
+        self.assertIsNone(await recorder.amax_notification_id())
+
+        originator_id1 = uuid4()
+        originator_id2 = uuid4()
+        stored_events = [
+            StoredEvent(
+                originator_id=originator_id1,
+                originator_version=1,
+                topic="topic1",
+                state=b"state1",
+            ),
+            StoredEvent(
+                originator_id=originator_id1,
+                originator_version=2,
+                topic="topic2",
+                state=b"state2",
+            ),
+            StoredEvent(
+                originator_id=originator_id2,
+                originator_version=1,
+                topic="topic1",
+                state=b"state3",
+            ),
+        ]
+        notification_ids = await recorder.ainsert_events(stored_events)
+        self.assertEqual(notification_ids, [1, 2, 3])
+
+        # Select events.
+        self.assertEqual(
+            await recorder.aselect_events(originator_id1), stored_events[:2]
+        )
+        self.assertEqual(
+            await recorder.aselect_events(originator_id1, desc=True, limit=1),
+            stored_events[1:2],
+        )
+        self.assertEqual(await recorder.aselect_events(originator_id1, gt=2), [])
+
+        # Select notifications.
+        notifications = await recorder.aselect_notifications(start=1, limit=10)
+        self.assertEqual([n.id for n in notifications], [1, 2, 3])
+        self.assertEqual(notifications[2].state, b"state3")
+        notifications = await recorder.aselect_notifications(
+            start=1, limit=10, topics=["topic1"], inclusive_of_start=False
+        )
+        self.assertEqual([n.id for n in notifications], [3])
+        self.assertEqual(await recorder.amax_notification_id(), 3)
+        headers = await recorder.aselect_notification_headers(start=2, limit=10)
+        self.assertEqual(
+            headers,
+            await sync_to_async(recorder.select_notification_headers)(
+                start=2, limit=10
+            ),
+        )
+        self.assertEqual([h.id for h in headers], [2, 3])
+
+        # Conflicts are still reported as integrity errors.
+        with self.assertRaises(IntegrityError):
+            await recorder.ainsert_events(stored_events[:1])
+
+        # The async methods agree with the sync methods.
+        self.assertEqual(
+            await recorder.aselect_notifications(start=None, limit=10),
+            await sync_to_async(recorder.select_notifications)(start=None, limit=10),
+        )
+
+
+class TestAsyncDjangoApplicationRecorderWithSQLiteFileDb(
+    TestAsyncDjangoApplicationRecorder
+):
+    db_alias = "sqlite_filedb"
+    databases = {"sqlite_filedb"}
+
+
+class TestAsyncDjangoApplicationRecorderWithPostgres(
+    TestAsyncDjangoApplicationRecorder
+):
+    db_alias = "postgres"
+    databases = {"postgres"}
+
+
 class TestDjangoProcessRecorder(DjangoTestCase, ProcessRecorderTestCase):
     def create_recorder(self) -> DjangoProcessRecorder:
         return DjangoProcessRecorder(application_name="app", model=StoredEventRecord)
@@ -139,8 +1054,174 @@ class TestDjangoProcessRecorder(DjangoTestCase, ProcessRecorderTestCase):
     def test_raises_when_lower_inserted_later(self) -> None:
         super().test_raises_when_lower_inserted_later()
 
+    def test_batch(self) -> None:
+        recorder = self.create_recorder()
+        originator_id = uuid4()
+        stored_events = [
+            StoredEvent(originator_id, version, "topic1", b"state")
+            for version in range(1, 4)
+        ]
+
+        with CaptureQueriesContext(connection) as ctx:
+            with recorder.batch():
+                for i, stored_event in enumerate(stored_events, start=1):
+                    notification_ids = recorder.insert_events(
+                        [stored_event], tracking=Tracking("upstream_app", i)
+                    )
+                    self.assertEqual(notification_ids, [])
+
+                # Nothing has been inserted yet.
+                self.assertEqual(StoredEventRecord.objects.count(), 0)
+
+                # Buffered events and tracking objects are read through.
+                self.assertEqual(recorder.select_events(originator_id), stored_events)
+                self.assertEqual(
+                    recorder.select_events(originator_id, gt=1, desc=True, limit=1),
+                    [stored_events[2]],
+                )
+                self.assertEqual(recorder.max_tracking_id("upstream_app"), 3)
+                self.assertEqual(
+                    recorder.select_events_many([originator_id], gt=2),
+                    {originator_id: stored_events[2:]},
+                )
+                recorder.snapshot_model = SnapshotRecord
+                self.assertEqual(
+                    recorder.select_snapshot_and_events(originator_id),
+                    (None, stored_events),
+                )
+
+                # Conflicts within the batch are detected.
+                with self.assertRaises(IntegrityError):
+                    recorder.insert_events([stored_events[0]])
+                with self.assertRaises(IntegrityError):
+                    recorder.insert_events([], tracking=Tracking("upstream_app", 3))
+
+        # One statement for each table.
+        inserts = [q for q in ctx.captured_queries if q["sql"].startswith("INSERT")]
+        self.assertEqual(len(inserts), 2)
+        self.assertEqual(recorder.select_events(originator_id), stored_events)
+        self.assertEqual(recorder.max_tracking_id("upstream_app"), 3)
+        notifications = recorder.select_notifications(start=None, limit=10)
+        self.assertEqual([n.id for n in notifications], [1, 2, 3])
+
+        # Nothing is inserted if the batch fails.
+        def insert_and_fail() -> None:
+            with recorder.batch():
+                recorder.insert_events(
+                    [StoredEvent(originator_id, 4, "topic1", b"state")],
+                    tracking=Tracking("upstream_app", 4),
+                )
+                raise ValueError
+
+        with self.assertRaises(ValueError):
+            insert_and_fail()
+        self.assertEqual(len(recorder.select_events(originator_id)), 3)
+        self.assertEqual(recorder.max_tracking_id("upstream_app"), 3)
+
+        # Conflicts with recorded events are detected when the batch is inserted.
+        with self.assertRaises(IntegrityError):
+            with recorder.batch():
+                recorder.insert_events(
+                    [StoredEvent(originator_id, 3, "topic1", b"state")],
+                    tracking=Tracking("upstream_app", 5),
+                )
+        self.assertEqual(recorder.max_tracking_id("upstream_app"), 3)
+
+    def test_batch_with_event_cache(self) -> None:
+        recorder = DjangoProcessRecorder(
+            application_name="app", model=StoredEventRecord, event_cache_size=10
+        )
+        originator_id = uuid4()
+        stored_event = StoredEvent(originator_id, 1, "topic1", b"state")
+        recorder.insert_events([stored_event])
+
+        # Buffered events are not cached, in case the batch fails.
+        with self.assertRaises(ValueError):
+            with recorder.batch():
+                recorder.insert_events(
+                    [StoredEvent(originator_id, 2, "topic1", b"state")]
+                )
+                self.assertEqual(len(recorder.select_events(originator_id)), 2)
+                raise ValueError
+        self.assertEqual(recorder.select_events(originator_id), [stored_event])
+
+
+class TestDjangoProcessRecorderWithSingleRowTracking(TestDjangoProcessRecorder):
+    def create_recorder(self) -> DjangoProcessRecorder:
+        return DjangoProcessRecorder(
+            application_name="app", model=StoredEventRecord, single_row_tracking=True
+        )
+
+    def test_raises_when_lower_inserted_later(self) -> None:
+        super(TestDjangoProcessRecorder, self).test_raises_when_lower_inserted_later()
+
+    def test_continues_from_multi_row_tracking(self) -> None:
+        multi_row_recorder = DjangoProcessRecorder(
+            application_name="app", model=StoredEventRecord
+        )
+        multi_row_recorder.insert_tracking(Tracking("upstream_app", 1))
+        multi_row_recorder.insert_tracking(Tracking("upstream_app", 2))
+
+        recorder = self.create_recorder()
+        self.assertEqual(recorder.max_tracking_id("upstream_app"), 2)
+
+        recorder.insert_events([], tracking=Tracking("upstream_app", 3))
+        recorder.insert_events([], tracking=Tracking("upstream_app", 4))
+        self.assertEqual(recorder.max_tracking_id("upstream_app"), 4)
+        self.assertEqual(TrackingPositionRecord.objects.count(), 1)
+        self.assertEqual(NotificationTrackingRecord.objects.count(), 2)
+
+
+class TestDjangoTrackingRecorder(DjangoTestCase, TrackingRecorderTestCase):
+    def create_recorder(self) -> DjangoTrackingRecorder:
+        return DjangoTrackingRecorder(
+            application_name="app", model=TrackingPositionRecord
+        )
+
+    def test_keeps_one_row_per_upstream_application(self) -> None:
+        recorder = self.create_recorder()
+        for notification_id in range(1, 6):
+            recorder.insert_tracking(Tracking("upstream1", notification_id))
+        recorder.insert_tracking(Tracking("upstream2", 3))
+
+        self.assertEqual(TrackingPositionRecord.objects.count(), 2)
+        self.assertEqual(recorder.max_tracking_id("upstream1"), 5)
+        self.assertEqual(recorder.max_tracking_id("upstream2"), 3)
+
+        # Positions are recorded separately for each downstream application.
+        other_recorder = DjangoTrackingRecorder(
+            application_name="other", model=TrackingPositionRecord
+        )
+        self.assertIsNone(other_recorder.max_tracking_id("upstream1"))
+
 
 del AggregateRecorderTestCase
 del ApplicationRecorderTestCase
 del ProcessRecorderTestCase
+del TrackingRecorderTestCase
 del TestDjangoApplicationRecorder
+
+
+class TestTopicHashIndexMigration(DjangoTestCase):
+    databases = {"default", "postgres"}
+
+    def test_index_is_added_concurrently_on_postgres(self) -> None:
+        migration = import_module("eventsourcing_django.migrations.0003_topic_hash")
+        operation = migration.Migration.operations[-1]
+        for alias, is_concurrent in (("default", False), ("postgres", True)):
+            connection = connections[alias]
+            state = MigrationLoader(connection).project_state(
+                ("eventsourcing_django", "0003_topic_hash")
+            )
+            with connection.schema_editor(atomic=False) as schema_editor:
+                operation.database_backwards(
+                    "eventsourcing_django", schema_editor, state, state
+                )
+            with CaptureQueriesContext(connection) as ctx:
+                with connection.schema_editor(atomic=False) as schema_editor:
+                    operation.database_forwards(
+                        "eventsourcing_django", schema_editor, state, state
+                    )
+            sql = " ".join(q["sql"] for q in ctx.captured_queries)
+            self.assertIn("stored_events_topic_hash_idx", sql)
+            self.assertEqual("CONCURRENTLY" in sql, is_concurrent)
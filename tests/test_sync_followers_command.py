@@ -3,16 +3,36 @@ from __future__ import annotations
 
 import importlib
 import os
+import signal
 import types
+from decimal import Decimal
+from functools import partial
+from io import StringIO
+from threading import Thread
+from time import sleep
+from typing import Any, Dict, Iterable, List, Tuple
+from unittest import mock
 from uuid import UUID
 
 import eventsourcing.system
 from django.apps.registry import apps
-from django.core.management import call_command
+from django.core.management import CommandError, call_command
+from django.db import connections, transaction
 from django.test import modify_settings, override_settings
+from eventsourcing.application import Cache
+from eventsourcing.domain import EventSourcingError
+from eventsourcing.persistence import IntegrityError
 from eventsourcing.tests.application import BankAccounts
 
-from tests.emails.application import FormalEmailProcess, InformalEmailProcess
+from eventsourcing_django.recorders import (
+    DjangoApplicationRecorder,
+    DjangoProcessRecorder,
+)
+from tests.emails.application import (
+    EmailArchive,
+    FormalEmailProcess,
+    InformalEmailProcess,
+)
 from tests.test_recorders import DjangoTestCase
 
 
@@ -133,6 +153,469 @@ class TestSyncCommand(DjangoTestCase):
         self.assertIsNone(formal_emails.recorder.max_tracking_id("BankAccounts"))
         self.assertIsNone(informal_emails.recorder.max_tracking_id("BankAccounts"))
 
+    def test_sync_all_apps_concurrently(self) -> None:
+        leader_notification_id = self._create_leader_events()
+        formal_emails = self.runner.get(FormalEmailProcess)
+        informal_emails = self.runner.get(InformalEmailProcess)
+
+        # Get the system running.
+        self.runner.start()
+
+        stdout = StringIO()
+        call_command("sync_followers", verbosity=2, jobs=2, stdout=stdout)
+
+        # Both follower apps have been synced.
+        self.assertEqual(
+            formal_emails.recorder.max_tracking_id("BankAccounts"),
+            leader_notification_id,
+        )
+        self.assertEqual(
+            informal_emails.recorder.max_tracking_id("BankAccounts"),
+            leader_notification_id,
+        )
+
+        # The output is in the order of the selection.
+        output = stdout.getvalue()
+        self.assertLess(output.index("[1/2]"), output.index("[2/2]"))
+        self.assertEqual(output.count("OK"), 2)
+
+    def test_sync_chain_of_followers_concurrently(self) -> None:
+        runner = eventsourcing.system.SingleThreadedRunner[UUID](
+            eventsourcing.system.System(
+                [
+                    [BankAccounts, FormalEmailProcess, EmailArchive],
+                    [BankAccounts, InformalEmailProcess],
+                ]
+            )
+        )
+        runner.start()
+        try:
+            accounts = runner.get(BankAccounts)
+            accounts.open_account(full_name="Alpha", email_address="alpha@example.com")
+            accounts.open_account(full_name="Beta", email_address="beta@example.com")
+            leader_notification_id = accounts.recorder.max_notification_id()
+            formal_emails = runner.get(FormalEmailProcess)
+            email_archive = runner.get(EmailArchive)
+
+            sync_followers = load_sync_followers_module()
+            sync_follower_with_leaders = sync_followers.sync_follower_with_leaders
+            synced: List[str] = []
+
+            def slow_formal_emails(
+                follower: Any, leader_names: Iterable[str], **kwargs: Any
+            ) -> Dict[str, int]:
+                if follower.name == "FormalEmailProcess":
+                    sleep(0.1)
+                result = sync_follower_with_leaders(follower, leader_names, **kwargs)
+                synced.append(follower.name)
+                return result
+
+            with mock.patch.object(
+                sync_followers, "get_eventsourcing_runner", return_value=runner
+            ), mock.patch.object(
+                sync_followers, "sync_follower_with_leaders", slow_formal_emails
+            ):
+                call_command("sync_followers", jobs=2, stdout=StringIO())
+        finally:
+            runner.stop()
+
+        # The archive is synchronized after the process it follows, in the same
+        # job, so it has processed the new events of the process.
+        self.assertLess(
+            synced.index("FormalEmailProcess"), synced.index("EmailArchive")
+        )
+        self.assertEqual(
+            formal_emails.recorder.max_tracking_id("BankAccounts"),
+            leader_notification_id,
+        )
+        self.assertEqual(
+            email_archive.recorder.max_tracking_id("FormalEmailProcess"),
+            formal_emails.recorder.max_notification_id(),
+        )
+
+    def test_sync_reports_events_count(self) -> None:
+        self._create_leader_events()
+
+        # Get the system running.
+        self.runner.start()
+
+        stdout = StringIO()
+        call_command("sync_followers", "FormalEmailProcess", verbosity=2, stdout=stdout)
+        self.assertIn("2 events from BankAccounts processed", stdout.getvalue())
+
+        # Events that have been processed aren't counted again.
+        stdout = StringIO()
+        call_command("sync_followers", "FormalEmailProcess", verbosity=2, stdout=stdout)
+        self.assertIn("0 events from BankAccounts processed", stdout.getvalue())
+
+    def test_dry_run_sync_all_apps_concurrently(self) -> None:
+        self._create_leader_events()
+        formal_emails = self.runner.get(FormalEmailProcess)
+        informal_emails = self.runner.get(InformalEmailProcess)
+
+        # Get the system running.
+        self.runner.start()
+
+        call_command("sync_followers", verbosity=2, dry_run=True, jobs=2)
+
+        # Neither of the follower apps have been synced.
+        self.assertIsNone(formal_emails.recorder.max_tracking_id("BankAccounts"))
+        self.assertIsNone(informal_emails.recorder.max_tracking_id("BankAccounts"))
+
+    def test_sync_failures_are_reported(self) -> None:
+        leader_notification_id = self._create_leader_events()
+        formal_emails = self.runner.get(FormalEmailProcess)
+        informal_emails = self.runner.get(InformalEmailProcess)
+
+        # Get the system running.
+        self.runner.start()
+
+        sync_followers = load_sync_followers_module()
+        sync_follower_with_leaders = sync_followers.sync_follower_with_leaders
+
+        def fail_formal_emails(
+            follower: Any, leader_names: Iterable[str], **kwargs: Any
+        ) -> Dict[str, int]:
+            if follower.name == "FormalEmailProcess":
+                raise EventSourcingError("Failed")
+            return sync_follower_with_leaders(follower, leader_names, **kwargs)
+
+        for jobs in (1, 2):
+            with mock.patch.object(
+                sync_followers, "sync_follower_with_leaders", fail_formal_emails
+            ):
+                with self.assertRaisesMessage(
+                    CommandError, "Failed to synchronize 1 follower."
+                ):
+                    call_command(
+                        "sync_followers",
+                        verbosity=2,
+                        jobs=jobs,
+                        stdout=StringIO(),
+                        stderr=StringIO(),
+                    )
+
+        # The other follower app has been synced.
+        self.assertIsNone(formal_emails.recorder.max_tracking_id("BankAccounts"))
+        self.assertEqual(
+            informal_emails.recorder.max_tracking_id("BankAccounts"),
+            leader_notification_id,
+        )
+
+    def test_sync_with_max_events(self) -> None:
+        leader_notification_id = self._create_leader_events()
+        assert leader_notification_id is not None
+        formal_emails = self.runner.get(FormalEmailProcess)
+
+        # Get the system running.
+        self.runner.start()
+
+        stdout = StringIO()
+        call_command(
+            "sync_followers",
+            "FormalEmailProcess",
+            verbosity=2,
+            max_events=1,
+            stdout=stdout,
+        )
+        self.assertIn("event limit reached", stdout.getvalue())
+        self.assertEqual(
+            formal_emails.recorder.max_tracking_id("BankAccounts"),
+            leader_notification_id - 1,
+        )
+
+        # The next run continues from where the last run stopped.
+        call_command("sync_followers", "FormalEmailProcess", max_events=1)
+        self.assertEqual(
+            formal_emails.recorder.max_tracking_id("BankAccounts"),
+            leader_notification_id,
+        )
+
+    def test_sync_with_time_budget(self) -> None:
+        self._create_leader_events()
+        formal_emails = self.runner.get(FormalEmailProcess)
+
+        # Get the system running.
+        self.runner.start()
+
+        stdout = StringIO()
+        call_command(
+            "sync_followers",
+            "FormalEmailProcess",
+            time_budget=1e-9,
+            stdout=stdout,
+        )
+        self.assertIn("The time budget has been used up", stdout.getvalue())
+        self.assertIsNone(formal_emails.recorder.max_tracking_id("BankAccounts"))
+
+    def test_sync_with_commit_every(self) -> None:
+        leader_notification_id = self._create_leader_events()
+        assert leader_notification_id is not None
+        formal_emails = self.runner.get(FormalEmailProcess)
+        informal_emails = self.runner.get(InformalEmailProcess)
+
+        # Get the system running.
+        self.runner.start()
+
+        def record_commits(follower: Any) -> List[Tuple[int, List[int]]]:
+            # Records the notifications whose processing had been committed when
+            # each notification was processed.
+            process_event = follower.process_event
+            committed: List[int] = []
+            processed: List[Tuple[int, List[int]]] = []
+
+            def wrapper(domain_event: Any, tracking: Any) -> None:
+                processed.append((tracking.notification_id, list(committed)))
+                process_event(domain_event, tracking)
+                transaction.on_commit(
+                    partial(committed.append, tracking.notification_id),
+                    using=self.django_db_alias,
+                )
+
+            follower.process_event = wrapper
+            return processed
+
+        # Without --commit-every, the changes are committed at the end.
+        processed = record_commits(informal_emails)
+        call_command("sync_followers", "InformalEmailProcess")
+        self.assertEqual(
+            processed,
+            [(leader_notification_id - 1, []), (leader_notification_id, [])],
+        )
+
+        # With --commit-every, the changes are committed in chunks.
+        processed = record_commits(formal_emails)
+        call_command("sync_followers", "FormalEmailProcess", commit_every=1)
+        self.assertEqual(
+            processed,
+            [
+                (leader_notification_id - 1, []),
+                (leader_notification_id, [leader_notification_id - 1]),
+            ],
+        )
+        self.assertEqual(
+            formal_emails.recorder.max_tracking_id("BankAccounts"),
+            leader_notification_id,
+        )
+
+    def test_sync_with_batch_inserts(self) -> None:
+        leader_notification_id = self._create_leader_events()
+        formal_emails = self.runner.get(FormalEmailProcess)
+
+        # Get the system running.
+        self.runner.start()
+
+        # The buffered events are inserted when the batch is flushed, which fails.
+        with mock.patch.object(
+            DjangoApplicationRecorder,
+            "insert_events",
+            side_effect=IntegrityError("Failed"),
+        ) as insert_events:
+            with self.assertRaisesMessage(
+                CommandError, "Failed to synchronize 1 follower."
+            ):
+                call_command(
+                    "sync_followers",
+                    "FormalEmailProcess",
+                    batch_inserts=True,
+                    stdout=StringIO(),
+                    stderr=StringIO(),
+                )
+        insert_events.assert_called_once()
+        self.assertEqual(len(insert_events.call_args.args[0]), 2)
+        self.assertIsNone(formal_emails.recorder.max_tracking_id("BankAccounts"))
+
+        # The follower is synced again.
+        call_command("sync_followers", "FormalEmailProcess", batch_inserts=True)
+        self.assertEqual(
+            formal_emails.recorder.max_tracking_id("BankAccounts"),
+            leader_notification_id,
+        )
+
+    def test_sync_with_aggregate_cache(self) -> None:
+        leader_notification_id = self._create_leader_events()
+        assert leader_notification_id is not None
+        formal_emails = self.runner.get(FormalEmailProcess)
+        formal_emails.repository.cache = Cache()
+        formal_emails.repository.fastforward = False
+
+        # Get the system running.
+        self.runner.start()
+
+        # The second insert fails, after the first aggregate has been cached.
+        insert_events = DjangoApplicationRecorder.insert_events
+        calls: List[int] = []
+
+        def fail_second_insert(
+            recorder: DjangoApplicationRecorder, *args: Any, **kwargs: Any
+        ) -> Any:
+            calls.append(len(calls))
+            if len(calls) == 2:
+                raise IntegrityError("Failed")
+            return insert_events(recorder, *args, **kwargs)
+
+        with mock.patch.object(
+            DjangoApplicationRecorder, "insert_events", fail_second_insert
+        ), mock.patch.object(DjangoProcessRecorder, "batch") as batch:
+            with self.assertRaisesMessage(
+                CommandError, "Failed to synchronize 1 follower."
+            ):
+                call_command(
+                    "sync_followers",
+                    "FormalEmailProcess",
+                    batch_inserts=True,
+                    stdout=StringIO(),
+                    stderr=StringIO(),
+                )
+
+        # The inserts aren't batched, and the aggregates processed by the failed
+        # synchronization are removed from the cache.
+        batch.assert_not_called()
+        self.assertEqual(len(calls), 2)
+        self.assertIsInstance(formal_emails.repository.cache, Cache)
+        self.assertEqual(formal_emails.repository.cache.cache, {})
+        self.assertEqual(
+            formal_emails.recorder.max_tracking_id("BankAccounts"),
+            leader_notification_id - 1,
+        )
+
+        call_command("sync_followers", "FormalEmailProcess")
+        self.assertEqual(
+            formal_emails.recorder.max_tracking_id("BankAccounts"),
+            leader_notification_id,
+        )
+
+    def test_follow(self) -> None:
+        leader_notification_id = self._create_leader_events()
+        formal_emails = self.runner.get(FormalEmailProcess)
+
+        # Get the system running.
+        self.runner.start()
+
+        def stop_when_synced() -> None:
+            try:
+                for _ in range(1000):
+                    max_tracking_id = formal_emails.recorder.max_tracking_id(
+                        "BankAccounts"
+                    )
+                    if max_tracking_id == leader_notification_id:
+                        break
+                    sleep(0.01)
+            finally:
+                connections.close_all()
+                os.kill(os.getpid(), signal.SIGTERM)
+
+        thread = Thread(target=stop_when_synced)
+        thread.start()
+        stdout = StringIO()
+        sync_followers = load_sync_followers_module()
+        with mock.patch.object(
+            sync_followers,
+            "close_old_connections",
+            wraps=sync_followers.close_old_connections,
+        ) as close_old_connections:
+            call_command(
+                "sync_followers",
+                "FormalEmailProcess",
+                follow=True,
+                poll_interval=0.01,
+                max_poll_interval=0.1,
+                time_budget=30,
+                verbosity=2,
+                stdout=stdout,
+            )
+        thread.join()
+
+        # Old connections are closed before the leaders are polled.
+        self.assertTrue(close_old_connections.called)
+
+        self.assertEqual(
+            formal_emails.recorder.max_tracking_id("BankAccounts"),
+            leader_notification_id,
+        )
+        output = stdout.getvalue()
+        self.assertIn("Lag: FormalEmailProcess 2 notifications", output)
+        self.assertIn("Stopped following.", output)
+        self.assertIs(signal.getsignal(signal.SIGTERM), signal.SIG_DFL)
+
+    def test_follow_counts_each_failed_follower_once(self) -> None:
+        self._create_leader_events()
+
+        # Get the system running.
+        self.runner.start()
+
+        sync_followers = load_sync_followers_module()
+
+        def fail(follower: Any, leader_names: Iterable[str], **kwargs: Any) -> Any:
+            raise EventSourcingError("Failed")
+
+        with mock.patch.object(sync_followers, "sync_follower_with_leaders", fail):
+            with self.assertRaisesMessage(
+                CommandError, "Failed to synchronize 1 follower."
+            ):
+                call_command(
+                    "sync_followers",
+                    "FormalEmailProcess",
+                    follow=True,
+                    poll_interval=0.01,
+                    max_poll_interval=0.01,
+                    time_budget=0.2,
+                    stdout=StringIO(),
+                    stderr=StringIO(),
+                )
+
+    def test_lags_of_followers_with_topics(self) -> None:
+        self._create_leader_events()
+        accounts = self.runner.get(BankAccounts)
+        opened_topic = accounts.recorder.select_notifications(start=None, limit=1)[
+            0
+        ].topic
+        account_id = accounts.open_account(
+            full_name="Gamma", email_address="gamma@example.com"
+        )
+        accounts.credit_account(account_id, Decimal("10.00"))
+        formal_emails = self.runner.get(FormalEmailProcess)
+        sync_followers = load_sync_followers_module()
+
+        def get_lag() -> int:
+            lags = sync_followers.Command._get_lags(
+                [formal_emails], {"BankAccounts": accounts}, self.runner.system
+            )
+            return lags["FormalEmailProcess"]
+
+        # Get the system running.
+        self.runner.start()
+
+        with mock.patch.object(formal_emails, "topics", [opened_topic]):
+            self.assertEqual(get_lag(), 4)
+            call_command("sync_followers", "FormalEmailProcess")
+            self.assertEqual(formal_emails.recorder.max_tracking_id("BankAccounts"), 3)
+
+            # The notifications after the last one with one of the follower's
+            # topics aren't counted.
+            self.assertEqual(get_lag(), 0)
+
+        # Without topics, the follower is behind by the last notification.
+        self.assertEqual(get_lag(), 1)
+
+    def test_follow_cannot_be_used_in_dry_run_mode(self) -> None:
+        with self.assertRaisesMessage(
+            CommandError, "The --follow option can't be used in dry-run mode."
+        ):
+            call_command("sync_followers", follow=True, dry_run=True)
+
+    def test_commit_every_cannot_be_used_in_dry_run_mode(self) -> None:
+        with self.assertRaisesMessage(
+            CommandError, "The --commit-every option can't be used in dry-run mode."
+        ):
+            call_command("sync_followers", commit_every=10, dry_run=True)
+
+    def test_jobs_must_be_positive(self) -> None:
+        with self.assertRaisesMessage(
+            CommandError, "The number of jobs must be at least 1."
+        ):
+            call_command("sync_followers", jobs=0)
+
 
 @override_settings(EVENTSOURCING_RUNNER="eventsourcing_runner_django.es_runner")
 class TestWithAppAttribute(TestSyncCommand):